@@ -1,8 +1,14 @@
-from flask import Flask, request, make_response
+from flask import Flask, g, has_request_context, request, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from flask_caching import Cache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from dotenv import load_dotenv
+import importlib
+import orjson
 import os
 
 # Load environment variables
@@ -12,9 +18,52 @@ load_dotenv()
 db = SQLAlchemy()
 jwt = JWTManager()
 migrate = Migrate()
+cache = Cache()
 
-def create_app():
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson so jsonify stays fast on large payloads"""
+    
+    def _options(self):
+        # Hand dates back to Flask's default hook so they serialize exactly as before
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
+# In development, requests running more SQL queries than this are logged as likely N+1s
+QUERY_COUNT_WARNING = 20
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """Count the SQL statements run during the current request"""
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+def create_app(minimal=False):
+    """
+    Build the Flask application.
+    
+    Args:
+        minimal: Only configure the database, skipping JWT, migrations, caching and
+            blueprints (for scripts that just need an app context)
+    
+    Returns:
+        The configured Flask app
+    """
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -25,13 +74,50 @@ def create_app():
         raise ValueError("DATABASE_URL environment variable is required")
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        # Larger compiled statement cache so hot queries and inserts skip SQL compilation
+        'query_cache_size': 1200,
+        # Keep more warm connections, check them before use and recycle them before
+        # the server drops idle ones
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
+    
+    if minimal:
+        db.init_app(app)
+        # Import the models module to register them on db.metadata, since no blueprint imports them here
+        importlib.import_module('app.models')
+        return app
+    
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False  # Tokens don't expire for simplicity
     
+    # Use Redis for response caching when available, otherwise an in-process cache
+    redis_url = os.getenv('REDIS_URL')
+    app.config['CACHE_TYPE'] = 'RedisCache' if redis_url else 'SimpleCache'
+    app.config['CACHE_REDIS_URL'] = redis_url
+    
     # Initialize extensions with app
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    cache.init_app(app)
+    
+    # In development, warn about requests whose query count points to an N+1
+    if os.getenv('FLASK_DEBUG', 'False').lower() == 'true':
+        if not event.contains(Engine, 'before_cursor_execute', _count_query):
+            event.listen(Engine, 'before_cursor_execute', _count_query)
+        
+        @app.after_request
+        def warn_on_query_count(response):
+            query_count = g.get('query_count', 0)
+            if query_count > QUERY_COUNT_WARNING:
+                app.logger.warning(
+                    "%s %s ran %d SQL queries, possible N+1", request.method, request.path, query_count
+                )
+            return response
     
     # Import and register blueprints
     from app.routes.auth import auth_bp
@@ -4,6 +4,11 @@ import bcrypt
 import secrets
 import string
 
+def _column_values(instance, columns):
+    """Read column values straight from the instance state, loading any that are expired"""
+    state = instance.__dict__
+    return {column: state[column] if column in state else getattr(instance, column) for column in columns}
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -64,17 +69,14 @@ class League(db.Model):
             if not League.query.filter_by(invite_code=code).first():
                 return code
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'commissioner_id': self.commissioner_id,
-            'invite_code': self.invite_code,
-            'is_setup_complete': self.is_setup_complete,
-            'setup_completed_at': self.setup_completed_at.isoformat() if self.setup_completed_at else None,
-            'created_at': self.created_at.isoformat(),
-            'member_count': self.members.count()
-        }
+    _SER_COLS = ('id', 'name', 'commissioner_id', 'invite_code', 'is_setup_complete')
+    
+    def to_dict(self, member_count=None):
+        data = _column_values(self, self._SER_COLS)
+        data['setup_completed_at'] = self.setup_completed_at.isoformat() if self.setup_completed_at else None
+        data['created_at'] = self.created_at.isoformat()
+        data['member_count'] = member_count if member_count is not None else self.members.count()
+        return data
 
 class LeagueMember(db.Model):
     __tablename__ = 'league_members'
@@ -88,21 +90,20 @@ class LeagueMember(db.Model):
     points_against = db.Column(db.Float, default=0.0)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Ensure unique user per league
-    __table_args__ = (db.UniqueConstraint('league_id', 'user_id'),)
+    # Ensure unique user per league; the constraint's index also serves league_id lookups.
+    # Standings read members of a league ordered by record.
+    __table_args__ = (
+        db.UniqueConstraint('league_id', 'user_id'),
+        db.Index('ix_lm_league_wins_pf', league_id, wins.desc(), points_for.desc()),
+    )
+    
+    _SER_COLS = ('id', 'league_id', 'user_id', 'wins', 'losses', 'points_for', 'points_against')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'league_id': self.league_id,
-            'user_id': self.user_id,
-            'username': self.user.username,
-            'wins': self.wins,
-            'losses': self.losses,
-            'points_for': self.points_for,
-            'points_against': self.points_against,
-            'joined_at': self.joined_at.isoformat()
-        }
+        data = _column_values(self, self._SER_COLS)
+        data['username'] = self.user.username
+        data['joined_at'] = self.joined_at.isoformat()
+        return data
 
 class Matchup(db.Model):
     __tablename__ = 'matchups'
@@ -118,18 +119,20 @@ class Matchup(db.Model):
     # Relationships
     bets = db.relationship('Bet', backref='matchup', lazy='dynamic')
     
+    # League schedules are read by league, newest week first; results are read by week
+    __table_args__ = (
+        db.Index('ix_matchup_league_week', league_id, week.desc()),
+        db.Index('ix_matchup_week', week),
+    )
+    
+    _SER_COLS = ('id', 'league_id', 'week', 'user1_id', 'user2_id', 'winner_id')
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'league_id': self.league_id,
-            'week': self.week,
-            'user1_id': self.user1_id,
-            'user2_id': self.user2_id,
-            'user1_username': self.user1.username,
-            'user2_username': self.user2.username,
-            'winner_id': self.winner_id,
-            'created_at': self.created_at.isoformat()
-        }
+        data = _column_values(self, self._SER_COLS)
+        data['user1_username'] = self.user1.username
+        data['user2_username'] = self.user2.username
+        data['created_at'] = self.created_at.isoformat()
+        return data
 
 class Bet(db.Model):
     __tablename__ = 'bets'
@@ -148,6 +151,12 @@ class Bet(db.Model):
     bookmaker_snapshot = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Bets are read per matchup (optionally per user), and pending bets per betting option when settling
+    __table_args__ = (
+        db.Index('ix_bet_matchup_user', matchup_id, user_id),
+        db.Index('ix_bet_option_pending', betting_option_id, postgresql_where=(status == 'pending')),
+    )
+    
     # Relationships
     betting_option = db.relationship('BettingOption', backref='bets')
     
@@ -209,6 +218,9 @@ class BettingOption(db.Model):
     locked_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Options are replaced and looked up by game
+    __table_args__ = (db.Index('ix_betting_option_game', game_id),)
+    
     def to_dict(self):
         return {
             'id': self.id,
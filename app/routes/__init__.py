@@ -1 +1,6 @@
 # This file makes the routes directory a Python package
+from flask_jwt_extended import get_jwt_identity
+
+def get_current_user_id():
+    """Return the authenticated user's id from the JWT verified for this request"""
+    return int(get_jwt_identity())
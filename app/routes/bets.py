@@ -3,7 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, LeagueMember, Matchup, Bet, Game, BettingOption, ParlayBet, ParlayLeg
 from app.services.odds_service import OddsService
-from app.services.parlay_service import calculate_parlay_from_options, validate_parlay_bets
+from app.services.parlay_service import calculate_parlay_from_options
 from datetime import datetime, timedelta
 import os
 
@@ -523,15 +523,12 @@ def place_parlay_bet():
             
             betting_options.append(option.to_dict())
         
-        # Validate parlay (check for different games)
+        # Validate and price the parlay
         try:
-            validate_parlay_bets(betting_options)
+            parlay_info = calculate_parlay_from_options(amount, betting_options)
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         
-        # Calculate parlay information
-        parlay_info = calculate_parlay_from_options(amount, betting_options)
-        
         # Check if user has enough budget remaining
         existing_bets = Bet.query.filter_by(user_id=user_id, week=week).all()
         existing_parlays = ParlayBet.query.filter_by(user_id=user_id, week=week).all()
@@ -547,8 +544,9 @@ def place_parlay_bet():
             user_id=user_id,
             matchup_id=matchup_id,
             amount=amount,
-            potential_payout=parlay_info['return'],
-            decimal_odds=parlay_info['decimal_odds'],
+            # Pricing is unrounded; store cents and 4-place odds as before
+            potential_payout=round(parlay_info['return'], 2),
+            decimal_odds=round(parlay_info['decimal_odds'], 4),
             week=week
         )
         
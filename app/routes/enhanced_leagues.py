@@ -1,10 +1,18 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
-from app.models import User, League, LeagueMember, Matchup, Bet
+from flask_jwt_extended import jwt_required
+from app import db, cache
+from app.routes import get_current_user_id
+from app.services.cache_service import (
+    DEFAULT_TIMEOUT, user_leagues_key, league_standings_key, is_league_member,
+    invalidate_membership, invalidate_user_leagues, invalidate_league_standings,
+    invalidate_league_members_leagues
+)
+from app.models import User, League, LeagueMember, Matchup, Bet, BettingOption, Game
+from app.services.standings_service import STARTING_BALANCE, get_longest_win_streaks
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from datetime import datetime
-import itertools
-import random
 import secrets
 import string
 
@@ -30,21 +38,18 @@ def generate_round_robin_schedule(teams, weeks_required=14):
         teams = teams + ['BYE']
     
     n = len(teams)
+    m = n - 1
     rounds = []
-    fixed = teams[0]
-    rotating = teams[1:]
     
-    # Generate rounds
-    for round_num in range(n - 1):
-        if len(rounds) >= weeks_required:
-            break
-            
+    # Circle method: team 0 stays fixed while the others rotate one slot per
+    # round, so each round's pairing is computed by indexing into `teams`
+    for round_num in range(min(m, weeks_required)):
         round_matches = []
         
         # Create matchups for this round
         for i in range(n // 2):
-            home_team = teams[i]
-            away_team = teams[n - 1 - i]
+            home_team = teams[0 if i == 0 else (i - 1 - round_num) % m + 1]
+            away_team = teams[(n - 2 - i - round_num) % m + 1]
             
             # Skip if either team is BYE
             if home_team != 'BYE' and away_team != 'BYE':
@@ -54,11 +59,6 @@ def generate_round_robin_schedule(teams, weeks_required=14):
                 })
         
         rounds.append(round_matches)
-        
-        # Rotate teams (except the first one)
-        if len(rotating) > 1:
-            rotating = [rotating[-1]] + rotating[:-1]
-            teams = [fixed] + rotating
     
     return rounds[:weeks_required]
 
@@ -148,32 +148,113 @@ def create_matchups_from_schedule(league_id, schedule, start_week=1):
     
     return matchups
 
+def _serialize_bet(bet):
+    """
+    Serialize a bet with its betting option and game for matchup views.
+    
+    Args:
+        bet: Bet object with a loaded betting option
+    
+    Returns:
+        Dictionary of bet, betting option and game fields
+    """
+    option = bet.betting_option
+    game = option.game
+    
+    return {
+        'id': bet.id,
+        'amount': bet.amount,
+        'potential_payout': bet.potential_payout,
+        'status': bet.status,
+        'betting_option': {
+            'id': option.id,
+            'outcome_name': option.outcome_name,
+            'outcome_point': option.outcome_point,
+            'bookmaker': option.bookmaker,
+            'american_odds': option.american_odds,
+            'decimal_odds': option.decimal_odds,
+            'market_type': option.market_type
+        },
+        'game': {
+            'id': game.id,
+            'home_team': game.home_team,
+            'away_team': game.away_team,
+            'start_time': game.start_time.isoformat()
+        }
+    }
+
+def _matchup_bets_query():
+    """
+    Build a bet query that loads only the columns read by _serialize_bet.
+    
+    The betting option and game are joined in the same statement.
+    
+    Returns:
+        Query for Bet objects
+    """
+    return Bet.query.options(
+        load_only(
+            Bet.id, Bet.user_id, Bet.matchup_id, Bet.betting_option_id,
+            Bet.amount, Bet.potential_payout, Bet.status
+        ),
+        joinedload(Bet.betting_option).load_only(
+            BettingOption.id, BettingOption.game_id, BettingOption.outcome_name,
+            BettingOption.outcome_point, BettingOption.bookmaker,
+            BettingOption.american_odds, BettingOption.decimal_odds,
+            BettingOption.market_type
+        ).joinedload(BettingOption.game).load_only(
+            Game.id, Game.home_team, Game.away_team, Game.start_time
+        )
+    )
+
 @leagues_bp.route('/user', methods=['GET'])
 @jwt_required()
 def get_user_leagues():
     """Get all leagues for the current user"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
-        # Get all leagues where user is a member
-        memberships = LeagueMember.query.filter_by(user_id=user_id).all()
-        leagues = []
+        # Serve from cache when the leagues list was built recently
+        cache_key = user_leagues_key(user_id)
+        leagues = cache.get(cache_key)
         
-        for membership in memberships:
-            league = membership.league
-            league_data = league.to_dict()
+        if leagues is None:
+            # Get all leagues where user is a member, loading each league in the same query
+            memberships = LeagueMember.query.options(joinedload(LeagueMember.league))\
+                .filter_by(user_id=user_id).all()
+            league_ids = [membership.league_id for membership in memberships]
             
-            # Add user-specific data
-            league_data['is_commissioner'] = league.commissioner_id == user_id
-            league_data['is_active'] = True  # For now, all leagues are active
+            # Member counts and win streaks for every league in one query each
+            member_counts = dict(
+                db.session.query(LeagueMember.league_id, func.count(LeagueMember.id))
+                .filter(LeagueMember.league_id.in_(league_ids))
+                .group_by(LeagueMember.league_id).all()
+            ) if league_ids else {}
+            longest_win_streaks = get_longest_win_streaks(user_id, league_ids)
             
-            # Calculate user's record in this league (mock data for now)
-            league_data['record'] = "0-0"
-            league_data['total_winnings'] = 0.0
-            league_data['avg_balance'] = 100.0
-            league_data['longest_win_streak'] = 0
+            leagues = []
+            for membership in memberships:
+                league = membership.league
+                league_data = league.to_dict(member_count=member_counts.get(league.id, 0))
+                
+                # Add user-specific data
+                league_data['is_commissioner'] = league.commissioner_id == user_id
+                league_data['is_active'] = True  # For now, all leagues are active
+                
+                # User's record in this league, from the standings stored on the membership
+                wins = membership.wins or 0
+                losses = membership.losses or 0
+                games_played = wins + losses
+                points_for = membership.points_for or 0.0
+                
+                league_data['record'] = f"{wins}-{losses}"
+                league_data['total_winnings'] = points_for - STARTING_BALANCE * games_played
+                league_data['avg_balance'] = points_for / games_played if games_played else STARTING_BALANCE
+                league_data['longest_win_streak'] = longest_win_streaks.get(league.id, 0)
+                
+                leagues.append(league_data)
             
-            leagues.append(league_data)
+            cache.set(cache_key, leagues, timeout=DEFAULT_TIMEOUT)
         
         return jsonify({
             'leagues': leagues
@@ -187,7 +268,7 @@ def get_user_leagues():
 def create_league():
     """Create a new league"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         data = request.get_json()
         
         if not data or 'name' not in data:
@@ -210,6 +291,8 @@ def create_league():
         
         db.session.add(member)
         db.session.commit()
+        invalidate_user_leagues(user_id)
+        invalidate_membership(user_id, league.id)
         
         return jsonify({
             'message': 'League created successfully',
@@ -225,7 +308,7 @@ def create_league():
 def join_league():
     """Join a league using invite code"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         data = request.get_json()
         
         if not data or 'invite_code' not in data:
@@ -237,13 +320,12 @@ def join_league():
         if not league:
             return jsonify({'error': 'Invalid invite code'}), 404
         
-        # Check if user is already a member
-        existing_member = LeagueMember.query.filter_by(
-            league_id=league.id,
-            user_id=user_id
-        ).first()
+        # Check if user is already a member without loading the row
+        already_member = db.session.query(
+            LeagueMember.query.filter_by(league_id=league.id, user_id=user_id).exists()
+        ).scalar()
         
-        if existing_member:
+        if already_member:
             return jsonify({'error': 'You are already a member of this league'}), 400
         
         # Add user as member
@@ -253,7 +335,16 @@ def join_league():
         )
         
         db.session.add(member)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent join won the race; the unique constraint rejected this one
+            db.session.rollback()
+            return jsonify({'error': 'You are already a member of this league'}), 400
+        # Every member's cached leagues list shows the member count
+        invalidate_league_members_leagues(league.id)
+        invalidate_league_standings(league.id)
+        invalidate_membership(user_id, league.id)
         
         return jsonify({
             'message': 'Successfully joined league',
@@ -269,15 +360,10 @@ def join_league():
 def get_league_details(league_id):
     """Get league details including members and standings"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
         league = League.query.get(league_id)
@@ -285,11 +371,14 @@ def get_league_details(league_id):
             return jsonify({'error': 'League not found'}), 404
         
         # Get all members with their stats
-        members = LeagueMember.query.filter_by(league_id=league_id).all()
+        members = LeagueMember.query.options(selectinload(LeagueMember.user))\
+            .filter_by(league_id=league_id).all()
         members_data = [member.to_dict() for member in members]
         
         # Get recent matchups
-        recent_matchups = Matchup.query.filter_by(league_id=league_id)\
+        recent_matchups = Matchup.query\
+            .options(selectinload(Matchup.user1), selectinload(Matchup.user2))\
+            .filter_by(league_id=league_id)\
             .order_by(Matchup.week.desc()).limit(5).all()
         matchups_data = [matchup.to_dict() for matchup in recent_matchups]
         
@@ -307,30 +396,40 @@ def get_league_details(league_id):
 def get_league_standings(league_id):
     """Get league standings"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
-        # Get all members sorted by wins (descending), then by points_for (descending)
-        members = LeagueMember.query.filter_by(league_id=league_id)\
-            .order_by(LeagueMember.wins.desc(), LeagueMember.points_for.desc()).all()
+        # Serve from cache when the standings were built recently
+        cache_key = league_standings_key(league_id)
+        standings = cache.get(cache_key)
         
-        standings = []
-        for i, member in enumerate(members, 1):
-            member_data = member.to_dict()
-            member_data['rank'] = i
-            member_data['win_percentage'] = (
-                member.wins / (member.wins + member.losses) 
-                if (member.wins + member.losses) > 0 else 0
-            )
-            standings.append(member_data)
+        if standings is None:
+            # Win percentage is computed in SQL; NULLIF leaves it NULL for members with no games
+            win_percentage = (
+                db.cast(LeagueMember.wins, db.Float)
+                / func.nullif(LeagueMember.wins + LeagueMember.losses, 0)
+            ).label('win_percentage')
+            
+            # Rank members by wins (descending), then by points_for (descending)
+            standings_order = (LeagueMember.wins.desc(), LeagueMember.points_for.desc())
+            rank = func.row_number().over(order_by=standings_order).label('rank')
+            
+            rows = db.session.query(LeagueMember, rank, win_percentage)\
+                .options(selectinload(LeagueMember.user))\
+                .filter(LeagueMember.league_id == league_id)\
+                .order_by(rank).all()
+            
+            standings = []
+            for member, member_rank, member_win_percentage in rows:
+                member_data = member.to_dict()
+                member_data['rank'] = member_rank
+                member_data['win_percentage'] = float(member_win_percentage or 0.0)
+                standings.append(member_data)
+            
+            cache.set(cache_key, standings, timeout=DEFAULT_TIMEOUT)
         
         return jsonify({'standings': standings}), 200
         
@@ -342,7 +441,7 @@ def get_league_standings(league_id):
 def generate_schedule(league_id):
     """Generate schedule for a league (commissioner only)"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is commissioner
         league = League.query.get(league_id)
@@ -368,15 +467,15 @@ def generate_schedule(league_id):
             league_id, regular_season_schedule, start_week=1
         )
         
-        # Add all matchups to database
-        for matchup in regular_season_matchups:
-            db.session.add(matchup)
+        # Add all matchups to database in a single bulk insert
+        db.session.bulk_save_objects(regular_season_matchups)
         
         # Mark league as setup complete
         league.is_setup_complete = True
         league.setup_completed_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_user_leagues(*team_ids)
         
         return jsonify({
             'message': 'Schedule generated successfully',
@@ -392,7 +491,7 @@ def generate_schedule(league_id):
 def generate_playoffs(league_id):
     """Generate playoff bracket (commissioner only)"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is commissioner
         league = League.query.get(league_id)
@@ -417,11 +516,11 @@ def generate_playoffs(league_id):
             league_id, playoff_schedule, start_week=15
         )
         
-        # Add playoff matchups to database
-        for matchup in playoff_matchups:
-            db.session.add(matchup)
+        # Add playoff matchups to database in a single bulk insert
+        db.session.bulk_save_objects(playoff_matchups)
         
         db.session.commit()
+        invalidate_user_leagues(*(member.user_id for member in standings))
         
         return jsonify({
             'message': 'Playoff bracket generated successfully',
@@ -437,15 +536,10 @@ def generate_playoffs(league_id):
 def get_week_matchups(league_id, week):
     """Get all matchups for a specific week"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
         # Get matchups for the week with comprehensive bet data
@@ -459,12 +553,12 @@ def get_week_matchups(league_id, week):
         for matchup in matchups:
             # Get regular bets for both users in this matchup
             from app.models import Bet, ParlayBet
-            user1_bets = Bet.query.filter_by(
+            user1_bets = _matchup_bets_query().filter_by(
                 matchup_id=matchup.id,
                 user_id=matchup.user1_id
             ).all()
             
-            user2_bets = Bet.query.filter_by(
+            user2_bets = _matchup_bets_query().filter_by(
                 matchup_id=matchup.id,
                 user_id=matchup.user2_id
             ).all()
@@ -487,55 +581,8 @@ def get_week_matchups(league_id, week):
             user2_potential_payout = sum(bet.potential_payout for bet in user2_bets) + sum(parlay.potential_payout for parlay in user2_parlay_bets)
             
             # Format bet data
-            user1_bets_data = []
-            for bet in user1_bets:
-                bet_data = {
-                    'id': bet.id,
-                    'amount': bet.amount,
-                    'potential_payout': bet.potential_payout,
-                    'status': bet.status,
-                    'betting_option': {
-                        'id': bet.betting_option.id,
-                        'outcome_name': bet.betting_option.outcome_name,
-                        'outcome_point': bet.betting_option.outcome_point,
-                        'bookmaker': bet.betting_option.bookmaker,
-                        'american_odds': bet.betting_option.american_odds,
-                        'decimal_odds': bet.betting_option.decimal_odds,
-                        'market_type': bet.betting_option.market_type
-                    },
-                    'game': {
-                        'id': bet.betting_option.game.id,
-                        'home_team': bet.betting_option.game.home_team,
-                        'away_team': bet.betting_option.game.away_team,
-                        'start_time': bet.betting_option.game.start_time.isoformat()
-                    }
-                }
-                user1_bets_data.append(bet_data)
-            
-            user2_bets_data = []
-            for bet in user2_bets:
-                bet_data = {
-                    'id': bet.id,
-                    'amount': bet.amount,
-                    'potential_payout': bet.potential_payout,
-                    'status': bet.status,
-                    'betting_option': {
-                        'id': bet.betting_option.id,
-                        'outcome_name': bet.betting_option.outcome_name,
-                        'outcome_point': bet.betting_option.outcome_point,
-                        'bookmaker': bet.betting_option.bookmaker,
-                        'american_odds': bet.betting_option.american_odds,
-                        'decimal_odds': bet.betting_option.decimal_odds,
-                        'market_type': bet.betting_option.market_type
-                    },
-                    'game': {
-                        'id': bet.betting_option.game.id,
-                        'home_team': bet.betting_option.game.home_team,
-                        'away_team': bet.betting_option.game.away_team,
-                        'start_time': bet.betting_option.game.start_time.isoformat()
-                    }
-                }
-                user2_bets_data.append(bet_data)
+            user1_bets_data = [_serialize_bet(bet) for bet in user1_bets]
+            user2_bets_data = [_serialize_bet(bet) for bet in user2_bets]
             
             # Add parlay bets to the bet data
             for parlay in user1_parlay_bets:
@@ -656,15 +703,10 @@ def get_week_matchups(league_id, week):
 def get_comprehensive_standings(league_id):
     """Get comprehensive standings with all calculated metrics"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
         # Get all members with their stats
@@ -732,15 +774,10 @@ def get_comprehensive_standings(league_id):
 def get_player_profile(league_id, user_id):
     """Get comprehensive player profile"""
     try:
-        current_user_id = int(get_jwt_identity())
+        current_user_id = get_current_user_id()
         
         # Check if current user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=current_user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(current_user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
         # Get the target player's membership
@@ -842,15 +879,10 @@ def get_player_profile(league_id, user_id):
 def get_all_matchups(league_id):
     """Get all matchups for a league"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
         # Get all matchups with comprehensive bet data
@@ -862,12 +894,12 @@ def get_all_matchups(league_id):
         for matchup in matchups:
             # Get bets for both users in this matchup
             from app.models import Bet
-            user1_bets = Bet.query.filter_by(
+            user1_bets = _matchup_bets_query().filter_by(
                 matchup_id=matchup.id,
                 user_id=matchup.user1_id
             ).all()
             
-            user2_bets = Bet.query.filter_by(
+            user2_bets = _matchup_bets_query().filter_by(
                 matchup_id=matchup.id,
                 user_id=matchup.user2_id
             ).all()
@@ -879,55 +911,8 @@ def get_all_matchups(league_id):
             user2_potential_payout = sum(bet.potential_payout for bet in user2_bets)
             
             # Format bet data
-            user1_bets_data = []
-            for bet in user1_bets:
-                bet_data = {
-                    'id': bet.id,
-                    'amount': bet.amount,
-                    'potential_payout': bet.potential_payout,
-                    'status': bet.status,
-                    'betting_option': {
-                        'id': bet.betting_option.id,
-                        'outcome_name': bet.betting_option.outcome_name,
-                        'outcome_point': bet.betting_option.outcome_point,
-                        'bookmaker': bet.betting_option.bookmaker,
-                        'american_odds': bet.betting_option.american_odds,
-                        'decimal_odds': bet.betting_option.decimal_odds,
-                        'market_type': bet.betting_option.market_type
-                    },
-                    'game': {
-                        'id': bet.betting_option.game.id,
-                        'home_team': bet.betting_option.game.home_team,
-                        'away_team': bet.betting_option.game.away_team,
-                        'start_time': bet.betting_option.game.start_time.isoformat()
-                    }
-                }
-                user1_bets_data.append(bet_data)
-            
-            user2_bets_data = []
-            for bet in user2_bets:
-                bet_data = {
-                    'id': bet.id,
-                    'amount': bet.amount,
-                    'potential_payout': bet.potential_payout,
-                    'status': bet.status,
-                    'betting_option': {
-                        'id': bet.betting_option.id,
-                        'outcome_name': bet.betting_option.outcome_name,
-                        'outcome_point': bet.betting_option.outcome_point,
-                        'bookmaker': bet.betting_option.bookmaker,
-                        'american_odds': bet.betting_option.american_odds,
-                        'decimal_odds': bet.betting_option.decimal_odds,
-                        'market_type': bet.betting_option.market_type
-                    },
-                    'game': {
-                        'id': bet.betting_option.game.id,
-                        'home_team': bet.betting_option.game.home_team,
-                        'away_team': bet.betting_option.game.away_team,
-                        'start_time': bet.betting_option.game.start_time.isoformat()
-                    }
-                }
-                user2_bets_data.append(bet_data)
+            user1_bets_data = [_serialize_bet(bet) for bet in user1_bets]
+            user2_bets_data = [_serialize_bet(bet) for bet in user2_bets]
             
             matchup_data = {
                 'id': matchup.id,
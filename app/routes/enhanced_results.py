@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
+from app.services.cache_service import is_league_member, invalidate_matchup_standings
 from app.models import User, League, LeagueMember, Matchup, Bet, BettingOption, Game
+from app.services.standings_service import STARTING_BALANCE, bet_net_change, calculate_matchup_balances
+from sqlalchemy import func
 from datetime import datetime
 import logging
 
@@ -17,7 +20,7 @@ def calculate_final_balance(bets):
     Returns:
         Final balance (float)
     """
-    total_balance = 100.0  # Starting balance
+    total_balance = STARTING_BALANCE
     
     for bet in bets:
         if bet.status == 'won':
@@ -76,33 +79,43 @@ def evaluate_bet(bet):
     
     return 'pending'
 
-def update_league_standings(league_id, user1_id, user2_id, winner_id):
-    """Update league standings after a matchup"""
-    # Get league members
-    member1 = LeagueMember.query.filter_by(league_id=league_id, user_id=user1_id).first()
-    member2 = LeagueMember.query.filter_by(league_id=league_id, user_id=user2_id).first()
+def get_league_members(league_ids):
+    """
+    Load the members of several leagues in one query.
+    
+    Args:
+        league_ids: Collection of league IDs
     
+    Returns:
+        Dictionary mapping (league_id, user_id) to LeagueMember
+    """
+    if not league_ids:
+        return {}
+    
+    members = LeagueMember.query.filter(LeagueMember.league_id.in_(league_ids)).all()
+    return {(member.league_id, member.user_id): member for member in members}
+
+def update_league_standings(member1, member2, user1_balance, user2_balance, winner_id):
+    """
+    Update league standings after a matchup.
+    
+    Args:
+        member1: LeagueMember of the first user in the matchup
+        member2: LeagueMember of the second user in the matchup
+        user1_balance: Final balance of the first user in the matchup
+        user2_balance: Final balance of the second user in the matchup
+        winner_id: ID of the winning user
+    """
     if member1 and member2:
         # Update wins/losses
-        if winner_id == user1_id:
+        if winner_id == member1.user_id:
             member1.wins += 1
             member2.losses += 1
-        elif winner_id == user2_id:
+        elif winner_id == member2.user_id:
             member2.wins += 1
             member1.losses += 1
         
         # Update points (using final balances)
-        matchup = Matchup.query.filter_by(league_id=league_id, user1_id=user1_id, user2_id=user2_id).first()
-        if matchup:
-            user1_bets = Bet.query.filter_by(user_id=user1_id, matchup_id=matchup.id).all()
-            user2_bets = Bet.query.filter_by(user_id=user2_id, matchup_id=matchup.id).all()
-        else:
-            user1_bets = []
-            user2_bets = []
-        
-        user1_balance = calculate_final_balance(user1_bets)
-        user2_balance = calculate_final_balance(user2_bets)
-        
         member1.points_for += user1_balance
         member1.points_against += user2_balance
         member2.points_for += user2_balance
@@ -121,6 +134,7 @@ def update_results():
         
         updated_games = []
         evaluated_bets = []
+        affected_matchup_ids = set()
         
         for game_data in data['games']:
             game_id = game_data.get('id')
@@ -148,11 +162,13 @@ def update_results():
                                 bet.status = new_status
                                 bet.resolved_at = datetime.utcnow()
                                 evaluated_bets.append(bet.id)
+                                affected_matchup_ids.add(bet.matchup_id)
         
-        # Update matchups after bet evaluation
-        calculate_matchup_results()
+        # Update matchups in the leagues touched by this update
+        decided = calculate_matchup_results(get_league_ids_for_matchups(affected_matchup_ids))
         
         db.session.commit()
+        invalidate_matchup_standings(decided)
         
         return jsonify({
             'message': 'Results updated successfully',
@@ -164,45 +180,87 @@ def update_results():
         db.session.rollback()
         return jsonify({'error': 'Failed to update results', 'details': str(e)}), 500
 
-def calculate_matchup_results():
-    """Calculate matchup results based on evaluated bets"""
+def get_league_ids_for_matchups(matchup_ids):
+    """
+    Get the distinct league IDs for a set of matchups.
+    
+    Args:
+        matchup_ids: Iterable of matchup IDs
+    
+    Returns:
+        Set of league IDs
+    """
+    matchup_ids = set(matchup_ids)
+    if not matchup_ids:
+        return set()
+    
+    rows = db.session.query(Matchup.league_id)\
+        .filter(Matchup.id.in_(matchup_ids)).distinct().all()
+    return {league_id for (league_id,) in rows}
+
+def calculate_matchup_results(league_ids=None):
+    """
+    Calculate matchup results based on evaluated bets.
+    
+    Args:
+        league_ids: Optional collection of league IDs to limit the sweep to.
+            When omitted, every league is checked.
+    
+    Returns:
+        List of matchups that were given a winner, so the caller can drop
+        cached standings once the changes are committed
+    """
     # Get all matchups that don't have winners yet
-    matchups = Matchup.query.filter_by(winner_id=None).all()
+    query = Matchup.query.filter_by(winner_id=None)
+    if league_ids is not None:
+        if not league_ids:
+            return []
+        query = query.filter(Matchup.league_id.in_(league_ids))
+    matchups = query.all()
+    if not matchups:
+        return []
     
-    for matchup in matchups:
-        # Get all bets for both users in this matchup
-        user1_bets = Bet.query.filter_by(
-            user_id=matchup.user1_id,
-            matchup_id=matchup.id
-        ).all()
-        
-        user2_bets = Bet.query.filter_by(
-            user_id=matchup.user2_id,
-            matchup_id=matchup.id
-        ).all()
-        
-        # Check if all bets are resolved
-        user1_pending = any(bet.status == 'pending' for bet in user1_bets)
-        user2_pending = any(bet.status == 'pending' for bet in user2_bets)
-        
-        if not user1_pending and not user2_pending:
-            # All bets resolved, calculate final balances
-            user1_balance = calculate_final_balance(user1_bets)
-            user2_balance = calculate_final_balance(user2_bets)
-            
-            # Determine winner
-            winner_id = None
-            if user1_balance > user2_balance:
-                winner_id = matchup.user1_id
-            elif user2_balance > user1_balance:
-                winner_id = matchup.user2_id
+    # Find matchups that still have unresolved bets in a single query
+    matchup_ids = [matchup.id for matchup in matchups]
+    pending_matchup_ids = {
+        matchup_id for (matchup_id,) in db.session.query(Bet.matchup_id).filter(
+            Bet.matchup_id.in_(matchup_ids),
+            Bet.status == 'pending'
+        ).distinct()
+    }
+    
+    # All bets resolved for the rest, aggregate their final balances in SQL
+    resolved_matchups = [m for m in matchups if m.id not in pending_matchup_ids]
+    balances = calculate_matchup_balances([m.id for m in resolved_matchups])
+    
+    # Load the members of every affected league once for the standings updates
+    members = get_league_members({m.league_id for m in resolved_matchups})
+    decided = []
+    
+    for matchup in resolved_matchups:
+        user1_balance = balances.get((matchup.id, matchup.user1_id), STARTING_BALANCE)
+        user2_balance = balances.get((matchup.id, matchup.user2_id), STARTING_BALANCE)
+        
+        # Determine winner
+        winner_id = None
+        if user1_balance > user2_balance:
+            winner_id = matchup.user1_id
+        elif user2_balance > user1_balance:
+            winner_id = matchup.user2_id
+        
+        # Update matchup winner if not already set
+        if matchup.winner_id is None and winner_id:
+            matchup.winner_id = winner_id
             
-            # Update matchup winner if not already set
-            if matchup.winner_id is None and winner_id:
-                matchup.winner_id = winner_id
-                
-                # Update league standings
-                update_league_standings(matchup.league_id, matchup.user1_id, matchup.user2_id, winner_id)
+            # Update league standings
+            update_league_standings(
+                members.get((matchup.league_id, matchup.user1_id)),
+                members.get((matchup.league_id, matchup.user2_id)),
+                user1_balance, user2_balance, winner_id
+            )
+            decided.append(matchup)
+    
+    return decided
 
 @results_bp.route('/week/<int:week>', methods=['GET'])
 @jwt_required()
@@ -214,56 +272,69 @@ def get_weekly_results(week):
         # Get all matchups for the week
         matchups = Matchup.query.filter_by(week=week).all()
         
-        results = []
+        # Leagues the user belongs to, fetched once for the whole week
+        allowed_leagues = {
+            league_id for league_id, in db.session.query(LeagueMember.league_id).filter_by(user_id=user_id)
+        }
         
-        for matchup in matchups:
-            # Check if user is part of this matchup or league
-            league_member = LeagueMember.query.filter_by(
-                league_id=matchup.league_id,
-                user_id=user_id
-            ).first()
-            
-            if not league_member:
-                continue  # Skip if user not in league
-            
-            # Get all bets for both users in this matchup
-            user1_bets = Bet.query.filter_by(
-                user_id=matchup.user1_id,
-                matchup_id=matchup.id
-            ).all()
-            
-            user2_bets = Bet.query.filter_by(
-                user_id=matchup.user2_id,
-                matchup_id=matchup.id
-            ).all()
-            
-            # Calculate final balances
-            user1_balance = calculate_final_balance(user1_bets)
-            user2_balance = calculate_final_balance(user2_bets)
-            
-            # Determine winner
-            winner_id = None
-            if user1_balance > user2_balance:
-                winner_id = matchup.user1_id
-            elif user2_balance > user1_balance:
-                winner_id = matchup.user2_id
-            
-            # Update matchup winner if not already set
-            if matchup.winner_id is None and winner_id:
-                matchup.winner_id = winner_id
+        results = []
+        decided = []
+        
+        # Avoid implicit flushes while the read queries run; results are only
+        # written when a matchup winner is assigned below
+        with db.session.no_autoflush:
+            for matchup in matchups:
+                # Check if user is part of this matchup or league
+                if matchup.league_id not in allowed_leagues:
+                    continue  # Skip if user not in league
                 
-                # Update league standings
-                update_league_standings(matchup.league_id, matchup.user1_id, matchup.user2_id, winner_id)
-            
-            matchup_data = matchup.to_dict()
-            matchup_data['user1_balance'] = user1_balance
-            matchup_data['user2_balance'] = user2_balance
-            matchup_data['user1_bets'] = [bet.to_dict() for bet in user1_bets]
-            matchup_data['user2_bets'] = [bet.to_dict() for bet in user2_bets]
+                # Get all bets for both users in this matchup
+                user1_bets = Bet.query.filter_by(
+                    user_id=matchup.user1_id,
+                    matchup_id=matchup.id
+                ).all()
+                
+                user2_bets = Bet.query.filter_by(
+                    user_id=matchup.user2_id,
+                    matchup_id=matchup.id
+                ).all()
+                
+                # Calculate final balances
+                user1_balance = calculate_final_balance(user1_bets)
+                user2_balance = calculate_final_balance(user2_bets)
+                
+                # Determine winner
+                winner_id = None
+                if user1_balance > user2_balance:
+                    winner_id = matchup.user1_id
+                elif user2_balance > user1_balance:
+                    winner_id = matchup.user2_id
+                
+                # Update matchup winner if not already set
+                if matchup.winner_id is None and winner_id:
+                    matchup.winner_id = winner_id
+                    decided.append((matchup, user1_balance, user2_balance))
+                
+                matchup_data = matchup.to_dict()
+                matchup_data['user1_balance'] = user1_balance
+                matchup_data['user2_balance'] = user2_balance
+                matchup_data['user1_bets'] = [bet.to_dict() for bet in user1_bets]
+                matchup_data['user2_bets'] = [bet.to_dict() for bet in user2_bets]
+                
+                results.append(matchup_data)
+        
+        # Only update standings and commit when a winner was actually recorded
+        if decided:
+            members = get_league_members({matchup.league_id for matchup, _, _ in decided})
+            for matchup, user1_balance, user2_balance in decided:
+                update_league_standings(
+                    members.get((matchup.league_id, matchup.user1_id)),
+                    members.get((matchup.league_id, matchup.user2_id)),
+                    user1_balance, user2_balance, matchup.winner_id
+                )
             
-            results.append(matchup_data)
-        
-        db.session.commit()
+            db.session.commit()
+            invalidate_matchup_standings([matchup for matchup, _, _ in decided])
         
         return jsonify({'results': results}), 200
         
@@ -282,6 +353,7 @@ def evaluate_all_pending_bets():
         pending_bets = Bet.query.filter_by(status='pending').all()
         
         evaluated_count = 0
+        affected_matchup_ids = set()
         
         for bet in pending_bets:
             new_status = evaluate_bet(bet)
@@ -289,11 +361,13 @@ def evaluate_all_pending_bets():
                 bet.status = new_status
                 bet.resolved_at = datetime.utcnow()
                 evaluated_count += 1
+                affected_matchup_ids.add(bet.matchup_id)
         
-        # Recalculate matchup results
-        calculate_matchup_results()
+        # Recalculate matchup results in the leagues touched by this evaluation
+        decided = calculate_matchup_results(get_league_ids_for_matchups(affected_matchup_ids))
         
         db.session.commit()
+        invalidate_matchup_standings(decided)
         
         return jsonify({
             'message': 'Bets evaluated successfully',
@@ -316,34 +390,33 @@ def get_matchup_details(matchup_id):
             return jsonify({'error': 'Matchup not found'}), 404
         
         # Check if user is part of this matchup or league
-        league_member = LeagueMember.query.filter_by(
-            league_id=matchup.league_id,
-            user_id=user_id
-        ).first()
-        
-        if not league_member:
+        if not is_league_member(user_id, matchup.league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
+        # Calculate totals, balances and locked bet counts for both users in
+        # one grouped query
+        totals = db.session.query(
+            Bet.user_id,
+            func.sum(Bet.amount),
+            func.sum(Bet.potential_payout),
+            bet_net_change(),
+            func.count(Bet.locked_at)
+        ).filter(Bet.matchup_id == matchup.id).group_by(Bet.user_id).all()
+        totals_by_user = {row[0]: row for row in totals}
+        
+        no_bets = (None, 0.0, 0.0, 0.0, 0)
+        _, user1_total_bet, user1_potential_payout, user1_change, user1_locked = \
+            totals_by_user.get(matchup.user1_id, no_bets)
+        _, user2_total_bet, user2_potential_payout, user2_change, user2_locked = \
+            totals_by_user.get(matchup.user2_id, no_bets)
+        
+        user1_balance = STARTING_BALANCE + (user1_change or 0.0)
+        user2_balance = STARTING_BALANCE + (user2_change or 0.0)
+        
         # Get all bets for both users
-        user1_bets = Bet.query.filter_by(
-            user_id=matchup.user1_id,
-            matchup_id=matchup.id
-        ).all()
-        
-        user2_bets = Bet.query.filter_by(
-            user_id=matchup.user2_id,
-            matchup_id=matchup.id
-        ).all()
-        
-        # Calculate balances
-        user1_balance = calculate_final_balance(user1_bets)
-        user2_balance = calculate_final_balance(user2_bets)
-        
-        # Calculate totals
-        user1_total_bet = sum(bet.amount for bet in user1_bets)
-        user2_total_bet = sum(bet.amount for bet in user2_bets)
-        user1_potential_payout = sum(bet.potential_payout for bet in user1_bets)
-        user2_potential_payout = sum(bet.potential_payout for bet in user2_bets)
+        bets = Bet.query.filter_by(matchup_id=matchup.id).all()
+        user1_bets = [bet for bet in bets if bet.user_id == matchup.user1_id]
+        user2_bets = [bet for bet in bets if bet.user_id == matchup.user2_id]
         
         matchup_data = matchup.to_dict()
         matchup_data.update({
@@ -355,7 +428,7 @@ def get_matchup_details(matchup_id):
             'user2_potential_payout': user2_potential_payout,
             'user1_bets': [bet.to_dict() for bet in user1_bets],
             'user2_bets': [bet.to_dict() for bet in user2_bets],
-            'is_locked': any(bet.locked_at for bet in user1_bets + user2_bets)
+            'is_locked': bool(user1_locked or user2_locked)
         })
         
         return jsonify({'matchup': matchup_data}), 200
@@ -1,39 +1,85 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from flask_jwt_extended import jwt_required
+from app import db, cache
+from app.routes import get_current_user_id
+from app.services.cache_service import (
+    DEFAULT_TIMEOUT, user_leagues_key, league_standings_key, is_league_member,
+    invalidate_membership, invalidate_user_leagues, invalidate_league_standings,
+    invalidate_league_members_leagues
+)
 from app.models import User, League, LeagueMember, Matchup
+from app.services.standings_service import STARTING_BALANCE, get_longest_win_streaks
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
-import itertools
-import random
+from functools import lru_cache
 
 leagues_bp = Blueprint('leagues', __name__)
 
+# Longest schedule a commissioner can request (one NFL regular season)
+MAX_SCHEDULE_WEEKS = 18
+
+# Playoff matchups as (week, seed, seed) by bracket size, with seeds indexing the
+# standings-ordered member list. Later rounds use placeholder seeds until they are
+# filled from earlier round winners.
+PLAYOFF_BRACKETS = {
+    # 8+ members: quarterfinals (week 15), semifinals (week 16), finals (week 17)
+    8: ((15, 0, 1), (15, 2, 3), (15, 4, 5), (15, 6, 7), (16, 4, 5), (16, 6, 7), (17, 0, 1)),
+    # 4-7 members: semifinals (week 15), finals (week 16)
+    4: ((15, 0, 1), (15, 2, 3), (16, 0, 1)),
+    # 2-3 members: head-to-head for the remaining weeks
+    2: ((15, 0, 1), (16, 0, 1), (17, 0, 1)),
+}
+
 @leagues_bp.route('/user', methods=['GET'])
 @jwt_required()
 def get_user_leagues():
     """Get all leagues for the current user"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
-        # Get all leagues where user is a member
-        memberships = LeagueMember.query.filter_by(user_id=user_id).all()
-        leagues = []
+        # Serve from cache when the leagues list was built recently
+        cache_key = user_leagues_key(user_id)
+        leagues = cache.get(cache_key)
         
-        for membership in memberships:
-            league = membership.league
-            league_data = league.to_dict()
+        if leagues is None:
+            # Get all leagues where user is a member, loading each league in the same query
+            memberships = LeagueMember.query.options(joinedload(LeagueMember.league))\
+                .filter_by(user_id=user_id).all()
+            league_ids = [membership.league_id for membership in memberships]
             
-            # Add user-specific data
-            league_data['is_commissioner'] = league.commissioner_id == user_id
-            league_data['is_active'] = True  # For now, all leagues are active
+            # Member counts and win streaks for every league in one query each
+            member_counts = dict(
+                db.session.query(LeagueMember.league_id, func.count(LeagueMember.id))
+                .filter(LeagueMember.league_id.in_(league_ids))
+                .group_by(LeagueMember.league_id).all()
+            ) if league_ids else {}
+            longest_win_streaks = get_longest_win_streaks(user_id, league_ids)
             
-            # Calculate user's record in this league (mock data for now)
-            league_data['record'] = "0-0"
-            league_data['total_winnings'] = 0.0
-            league_data['avg_balance'] = 100.0
-            league_data['longest_win_streak'] = 0
+            leagues = []
+            for membership in memberships:
+                league = membership.league
+                league_data = league.to_dict(member_count=member_counts.get(league.id, 0))
+                
+                # Add user-specific data
+                league_data['is_commissioner'] = league.commissioner_id == user_id
+                league_data['is_active'] = True  # For now, all leagues are active
+                
+                # User's record in this league, from the standings stored on the membership
+                wins = membership.wins or 0
+                losses = membership.losses or 0
+                games_played = wins + losses
+                points_for = membership.points_for or 0.0
+                
+                league_data['record'] = f"{wins}-{losses}"
+                league_data['total_winnings'] = points_for - STARTING_BALANCE * games_played
+                league_data['avg_balance'] = points_for / games_played if games_played else STARTING_BALANCE
+                league_data['longest_win_streak'] = longest_win_streaks.get(league.id, 0)
+                
+                leagues.append(league_data)
             
-            leagues.append(league_data)
+            cache.set(cache_key, leagues, timeout=DEFAULT_TIMEOUT)
         
         return jsonify({
             'leagues': leagues
@@ -48,7 +94,7 @@ def create_league():
     """Create a new league"""
     try:
         data = request.get_json()
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         if not data or 'name' not in data:
             return jsonify({'error': 'League name is required'}), 400
@@ -67,6 +113,8 @@ def create_league():
         db.session.add(member)
         
         db.session.commit()
+        invalidate_user_leagues(user_id)
+        invalidate_membership(user_id, league.id)
         
         return jsonify({
             'message': 'League created successfully',
@@ -83,7 +131,7 @@ def join_league():
     """Join a league using invite code"""
     try:
         data = request.get_json()
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         if not data or 'invite_code' not in data:
             return jsonify({'error': 'Invite code is required'}), 400
@@ -95,19 +143,27 @@ def join_league():
         if not league:
             return jsonify({'error': 'Invalid invite code'}), 404
         
-        # Check if user is already a member
-        existing_member = LeagueMember.query.filter_by(
-            league_id=league.id, 
-            user_id=user_id
-        ).first()
+        # Check if user is already a member without loading the row
+        already_member = db.session.query(
+            LeagueMember.query.filter_by(league_id=league.id, user_id=user_id).exists()
+        ).scalar()
         
-        if existing_member:
+        if already_member:
             return jsonify({'error': 'You are already a member of this league'}), 409
         
         # Add user to league
         member = LeagueMember(league_id=league.id, user_id=user_id)
         db.session.add(member)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent join won the race; the unique constraint rejected this one
+            db.session.rollback()
+            return jsonify({'error': 'You are already a member of this league'}), 409
+        # Every member's cached leagues list shows the member count
+        invalidate_league_members_leagues(league.id)
+        invalidate_league_standings(league.id)
+        invalidate_membership(user_id, league.id)
         
         return jsonify({
             'message': 'Successfully joined league',
@@ -123,15 +179,10 @@ def join_league():
 def get_league_details(league_id):
     """Get league details including members and standings"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
         league = League.query.get(league_id)
@@ -139,11 +190,14 @@ def get_league_details(league_id):
             return jsonify({'error': 'League not found'}), 404
         
         # Get all members with their stats
-        members = LeagueMember.query.filter_by(league_id=league_id).all()
+        members = LeagueMember.query.options(selectinload(LeagueMember.user))\
+            .filter_by(league_id=league_id).all()
         members_data = [member.to_dict() for member in members]
         
         # Get recent matchups
-        recent_matchups = Matchup.query.filter_by(league_id=league_id)\
+        recent_matchups = Matchup.query\
+            .options(selectinload(Matchup.user1), selectinload(Matchup.user2))\
+            .filter_by(league_id=league_id)\
             .order_by(Matchup.week.desc()).limit(5).all()
         matchups_data = [matchup.to_dict() for matchup in recent_matchups]
         
@@ -161,30 +215,40 @@ def get_league_details(league_id):
 def get_league_standings(league_id):
     """Get league standings"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is a member of the league
-        member = LeagueMember.query.filter_by(
-            league_id=league_id, 
-            user_id=user_id
-        ).first()
-        
-        if not member:
+        if not is_league_member(user_id, league_id):
             return jsonify({'error': 'You are not a member of this league'}), 403
         
-        # Get all members sorted by wins (descending), then by points_for (descending)
-        members = LeagueMember.query.filter_by(league_id=league_id)\
-            .order_by(LeagueMember.wins.desc(), LeagueMember.points_for.desc()).all()
+        # Serve from cache when the standings were built recently
+        cache_key = league_standings_key(league_id)
+        standings = cache.get(cache_key)
         
-        standings = []
-        for i, member in enumerate(members, 1):
-            member_data = member.to_dict()
-            member_data['rank'] = i
-            member_data['win_percentage'] = (
-                member.wins / (member.wins + member.losses) 
-                if (member.wins + member.losses) > 0 else 0
-            )
-            standings.append(member_data)
+        if standings is None:
+            # Win percentage is computed in SQL; NULLIF leaves it NULL for members with no games
+            win_percentage = (
+                db.cast(LeagueMember.wins, db.Float)
+                / func.nullif(LeagueMember.wins + LeagueMember.losses, 0)
+            ).label('win_percentage')
+            
+            # Rank members by wins (descending), then by points_for (descending)
+            standings_order = (LeagueMember.wins.desc(), LeagueMember.points_for.desc())
+            rank = func.row_number().over(order_by=standings_order).label('rank')
+            
+            rows = db.session.query(LeagueMember, rank, win_percentage)\
+                .options(selectinload(LeagueMember.user))\
+                .filter(LeagueMember.league_id == league_id)\
+                .order_by(rank).all()
+            
+            standings = []
+            for member, member_rank, member_win_percentage in rows:
+                member_data = member.to_dict()
+                member_data['rank'] = member_rank
+                member_data['win_percentage'] = float(member_win_percentage or 0.0)
+                standings.append(member_data)
+            
+            cache.set(cache_key, standings, timeout=DEFAULT_TIMEOUT)
         
         return jsonify({'standings': standings}), 200
         
@@ -196,7 +260,7 @@ def get_league_standings(league_id):
 def generate_schedule(league_id):
     """Generate weekly schedule for the league"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Check if user is the commissioner
         league = League.query.get(league_id)
@@ -214,49 +278,25 @@ def generate_schedule(league_id):
         # Get data for schedule generation
         data = request.get_json() or {}
         weeks = data.get('weeks', 10)  # Default 10 weeks
+        if not isinstance(weeks, int) or isinstance(weeks, bool) or not 1 <= weeks <= MAX_SCHEDULE_WEEKS:
+            return jsonify({'error': f'Weeks must be a whole number from 1 to {MAX_SCHEDULE_WEEKS}'}), 400
         
         # Clear existing matchups for this league
-        Matchup.query.filter_by(league_id=league_id).delete()
+        Matchup.query.filter_by(league_id=league_id).delete(synchronize_session=False)
         
         # Generate round-robin schedule
         user_ids = [member.user_id for member in members]
-        matchups = []
-        
-        # Create all possible pairs
-        pairs = list(itertools.combinations(user_ids, 2))
-        
-        # Distribute pairs across weeks
-        for week in range(1, weeks + 1):
-            week_matchups = []
-            
-            # For each week, try to assign matchups
-            remaining_pairs = pairs.copy()
-            used_users = set()
-            
-            while remaining_pairs and len(week_matchups) < len(user_ids) // 2:
-                for pair in remaining_pairs[:]:
-                    if pair[0] not in used_users and pair[1] not in used_users:
-                        matchup = Matchup(
-                            league_id=league_id,
-                            week=week,
-                            user1_id=pair[0],
-                            user2_id=pair[1]
-                        )
-                        week_matchups.append(matchup)
-                        used_users.add(pair[0])
-                        used_users.add(pair[1])
-                        remaining_pairs.remove(pair)
-                        break
-                else:
-                    break
-            
-            matchups.extend(week_matchups)
+        matchups = [
+            {'league_id': league_id, 'week': week, 'user1_id': user1_id, 'user2_id': user2_id}
+            for week, user1_id, user2_id in _round_robin_pairs(user_ids, weeks)
+        ]
         
-        # Add matchups to database
-        for matchup in matchups:
-            db.session.add(matchup)
+        # Add matchups to database in a single executemany of a cached Core INSERT
+        if matchups:
+            db.session.execute(insert(Matchup), matchups)
         
         db.session.commit()
+        invalidate_user_leagues(*user_ids)
         
         return jsonify({
             'message': f'Schedule generated for {weeks} weeks',
@@ -272,7 +312,7 @@ def generate_schedule(league_id):
 def confirm_league_setup(league_id):
     """Commissioner confirms league setup and generates all matchups"""
     try:
-        user_id = int(get_jwt_identity())
+        user_id = get_current_user_id()
         
         # Get league and verify commissioner
         league = League.query.get(league_id)
@@ -285,29 +325,32 @@ def confirm_league_setup(league_id):
         if league.is_setup_complete:
             return jsonify({'error': 'League setup is already complete'}), 400
         
-        # Get all league members
-        members = LeagueMember.query.filter_by(league_id=league_id).all()
-        member_ids = [member.user_id for member in members]
+        # Get all league members in standings order; playoff seeds are taken from this order
+        member_ids = [
+            member_id for member_id, in db.session.query(LeagueMember.user_id)
+            .filter(LeagueMember.league_id == league_id)
+            .order_by(LeagueMember.wins.desc(), LeagueMember.points_for.desc(), LeagueMember.id)
+        ]
         
         if len(member_ids) < 2:
             return jsonify({'error': 'League must have at least 2 members to generate matchups'}), 400
         
         # Generate regular season matchups (weeks 1-14)
-        regular_season_matchups = generate_regular_season_matchups(league_id, member_ids)
+        regular_season_matchups = list(generate_regular_season_matchups(league_id, member_ids))
         
         # Generate playoff matchups (weeks 15-17)
         playoff_matchups = generate_playoff_matchups(league_id, member_ids)
         
-        # Add all matchups to database
+        # Add all matchups to database in a single executemany of a cached Core INSERT
         all_matchups = regular_season_matchups + playoff_matchups
-        for matchup in all_matchups:
-            db.session.add(matchup)
+        db.session.execute(insert(Matchup), all_matchups)
         
         # Mark league as setup complete
         league.is_setup_complete = True
         league.setup_completed_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_user_leagues(*member_ids)
         
         return jsonify({
             'message': 'League setup confirmed successfully',
@@ -320,140 +363,80 @@ def confirm_league_setup(league_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to confirm league setup', 'details': str(e)}), 500
 
-def generate_regular_season_matchups(league_id, member_ids):
-    """Generate regular season matchups for weeks 1-14"""
-    matchups = []
+@lru_cache(maxsize=64)
+def _rotation_table(num_slots, weeks):
+    """
+    Precompute circle-method pairings for a league size.
     
-    # Create a copy of member_ids to work with
-    members = member_ids.copy()
+    Args:
+        num_slots: Number of schedule slots (even, including any bye slot)
+        weeks: Number of weeks to schedule
     
-    # For odd number of members, add a "bye" member (use -1 as placeholder)
-    if len(members) % 2 == 1:
-        members.append(-1)
+    Returns:
+        Tuple of (week, slot1, slot2) index triples
+    """
+    rotation = list(range(num_slots))
+    half = num_slots // 2
+    table = []
     
-    # Generate matchups for each week
-    for week in range(1, 15):  # weeks 1-14
-        week_matchups = []
-        
-        # Rotate members for each week (round-robin style)
-        if week > 1:
-            # Move first member to end, shift others up
-            members = members[1:] + [members[0]]
-        
-        # Pair up members
-        for i in range(0, len(members), 2):
-            user1_id = members[i]
-            user2_id = members[i + 1]
-            
-            # Skip if either is a bye week
-            if user1_id == -1 or user2_id == -1:
-                continue
-            
-            matchup = Matchup(
-                league_id=league_id,
-                week=week,
-                user1_id=user1_id,
-                user2_id=user2_id
-            )
-            week_matchups.append(matchup)
-        
-        matchups.extend(week_matchups)
+    for week in range(1, weeks + 1):
+        # Pair the i-th slot with its mirror from the end
+        table.extend((week, rotation[i], rotation[-1 - i]) for i in range(half))
+        
+        # Keep the first slot fixed and rotate the rest by one
+        rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
     
-    return matchups
+    return tuple(table)
 
-def generate_playoff_matchups(league_id, member_ids):
-    """Generate playoff bracket for weeks 15-17"""
-    matchups = []
+def _round_robin_pairs(user_ids, weeks):
+    """
+    Yield circle-method round-robin pairings.
     
-    # For playoffs, we'll use a simple bracket system
-    # Week 15: Quarterfinals (if 8+ members) or Semifinals (if 4-7 members)
-    # Week 16: Semifinals (if 8+ members) or Finals (if 4-7 members)  
-    # Week 17: Finals (if 8+ members) or Championship (if 4-7 members)
+    Args:
+        user_ids: List of user IDs in the league
+        weeks: Number of weeks to schedule
     
-    num_members = len(member_ids)
+    Returns:
+        Iterator of (week, user1_id, user2_id) tuples; members on a bye are skipped
+    """
+    # For odd number of members, add a "bye" member (use -1 as placeholder)
+    members = user_ids + [-1] if len(user_ids) % 2 == 1 else user_ids
     
+    # Look up each week's pairings from the precomputed table
+    for week, slot1, slot2 in _rotation_table(len(members), weeks):
+        user1_id = members[slot1]
+        user2_id = members[slot2]
+        
+        # Skip if either is a bye week
+        if user1_id == -1 or user2_id == -1:
+            continue
+        
+        yield week, user1_id, user2_id
+
+def generate_regular_season_matchups(league_id, member_ids):
+    """Generate regular season matchup rows for weeks 1-14"""
+    for week, user1_id, user2_id in _round_robin_pairs(member_ids, 14):  # weeks 1-14
+        yield {
+            'league_id': league_id,
+            'week': week,
+            'user1_id': user1_id,
+            'user2_id': user2_id
+        }
+
+def _playoff_bracket_size(num_members):
+    """Return the PLAYOFF_BRACKETS key for a league size, or None if there are too few members"""
     if num_members >= 8:
-        # 8+ members: Full bracket
-        # Week 15: Quarterfinals (8 teams -> 4 teams)
-        # Week 16: Semifinals (4 teams -> 2 teams)
-        # Week 17: Finals (2 teams -> 1 champion)
-        
-        # For now, we'll create placeholder matchups that will be filled based on regular season standings
-        # The actual seeding will be determined by regular season performance
-        
-        # Week 15 - Quarterfinals (4 matchups)
-        for i in range(4):
-            if i * 2 + 1 < len(member_ids):
-                matchup = Matchup(
-                    league_id=league_id,
-                    week=15,
-                    user1_id=member_ids[i * 2],
-                    user2_id=member_ids[i * 2 + 1]
-                )
-                matchups.append(matchup)
-        
-        # Week 16 - Semifinals (2 matchups) - Use actual members for now
-        # In a real implementation, these would be filled by quarterfinal winners
-        semifinal_members = member_ids[4:8] if len(member_ids) >= 8 else member_ids[2:4]
-        for i in range(2):
-            if i * 2 + 1 < len(semifinal_members):
-                matchup = Matchup(
-                    league_id=league_id,
-                    week=16,
-                    user1_id=semifinal_members[i * 2],
-                    user2_id=semifinal_members[i * 2 + 1]
-                )
-                matchups.append(matchup)
-        
-        # Week 17 - Finals (1 matchup) - Use actual members for now
-        # In a real implementation, this would be filled by semifinal winners
-        if len(member_ids) >= 2:
-            matchup = Matchup(
-                league_id=league_id,
-                week=17,
-                user1_id=member_ids[0],
-                user2_id=member_ids[1]
-            )
-            matchups.append(matchup)
-        
-    elif num_members >= 4:
-        # 4-7 members: Smaller bracket
-        # Week 15: Semifinals (4 teams -> 2 teams)
-        # Week 16: Finals (2 teams -> 1 champion)
-        # Week 17: No games (or consolation)
-        
-        # Week 15 - Semifinals
-        for i in range(min(2, num_members // 2)):
-            if i * 2 + 1 < len(member_ids):
-                matchup = Matchup(
-                    league_id=league_id,
-                    week=15,
-                    user1_id=member_ids[i * 2],
-                    user2_id=member_ids[i * 2 + 1]
-                )
-                matchups.append(matchup)
-        
-        # Week 16 - Finals - Use actual members for now
-        # In a real implementation, this would be filled by semifinal winners
-        if len(member_ids) >= 2:
-            matchup = Matchup(
-                league_id=league_id,
-                week=16,
-                user1_id=member_ids[0],
-                user2_id=member_ids[1]
-            )
-            matchups.append(matchup)
-        
-    else:
-        # Less than 4 members: Simple head-to-head for remaining weeks
-        for week in range(15, 18):
-            if len(member_ids) >= 2:
-                matchup = Matchup(
-                    league_id=league_id,
-                    week=week,
-                    user1_id=member_ids[0],
-                    user2_id=member_ids[1]
-                )
-                matchups.append(matchup)
-    
-    return matchups
+        return 8
+    if num_members >= 4:
+        return 4
+    if num_members >= 2:
+        return 2
+    return None
+
+def generate_playoff_matchups(league_id, member_ids):
+    """Generate playoff bracket matchup rows for weeks 15-17 from member IDs ordered by seed"""
+    bracket = PLAYOFF_BRACKETS.get(_playoff_bracket_size(len(member_ids)), ())
+    return [
+        {'league_id': league_id, 'week': week, 'user1_id': member_ids[seed1], 'user2_id': member_ids[seed2]}
+        for week, seed1, seed2 in bracket
+    ]
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import User, LeagueMember, Matchup, Bet, Game
+from app.services.cache_service import invalidate_matchup_standings
+from app.models import User, LeagueMember, Matchup, Bet, BettingOption, Game
+from app.services.standings_service import STARTING_BALANCE, calculate_matchup_balances
 from app.services.odds_service import OddsService
+from collections import defaultdict
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 
 results_bp = Blueprint('results', __name__)
@@ -23,47 +27,67 @@ def update_results():
         data = request.get_json() or {}
         week = data.get('week')
         
+        # Only games that have already started
+        games_query = db.session.query(Game).filter(Game.start_time <= datetime.utcnow())
+        
         if week:
             # Update results for specific week
-            games = Game.query.filter_by(week=week).all()
+            games_query = games_query.filter(Game.week == week)
         else:
             # Update all games that haven't been processed
-            games = Game.query.filter(Game.result.is_(None)).all()
+            games_query = games_query.filter(Game.result.is_(None))
+        
+        # Get results for all started games with one API request, before taking any row locks
+        game_ids = [game_id for game_id, in games_query.with_entities(Game.id)]
+        results_by_game = odds_service.get_all_game_results(game_ids)
+        finished_game_ids = [game_id for game_id in game_ids if results_by_game.get(game_id)]
+        
+        # Lock the finished games until commit; games another request is already processing are
+        # skipped, so concurrent updates never settle the same bets twice
+        games = games_query.filter(Game.id.in_(finished_game_ids))\
+            .with_for_update(skip_locked=True).all() if finished_game_ids else []
         
         updated_games = 0
         processed_bets = 0
         
+        # Get pending bets for all locked games in one query
+        pending_bets_by_game = get_pending_bets_by_game([game.id for game in games])
+        bet_status_updates = []
+        
         for game in games:
-            # Skip if game hasn't started yet
-            if datetime.utcnow() < game.start_time:
-                continue
-            
-            # Get game result from API
-            game_result = odds_service.get_game_result(game.id)
+            game_result = results_by_game.get(game.id)
             
             if game_result:
                 game.result = game_result
                 updated_games += 1
                 
                 # Process all bets for this game
-                bets = Bet.query.filter_by(game_id=game.id, status='pending').all()
-                
-                for bet in bets:
-                    # Determine if bet won or lost
-                    if game_result == 'home_win' and bet.team == game.home_team:
-                        bet.status = 'won'
-                    elif game_result == 'away_win' and bet.team == game.away_team:
-                        bet.status = 'won'
+                for bet_id, team in pending_bets_by_game[game.id]:
+                    # Determine if bet won or lost from the team the bet was placed on
+                    if game_result == 'home_win' and team == game.home_team:
+                        status = 'won'
+                    elif game_result == 'away_win' and team == game.away_team:
+                        status = 'won'
                     else:
-                        bet.status = 'lost'
+                        status = 'lost'
                     
+                    bet_status_updates.append({'id': bet_id, 'status': status})
                     processed_bets += 1
         
-        # Calculate matchup results for the week
+        # Write all bet outcomes in one batch
+        if bet_status_updates:
+            db.session.bulk_update_mappings(Bet, bet_status_updates)
+        
+        # Calculate matchup results for the week from balances summed in SQL
+        decided = []
         if week:
-            calculate_matchup_results(week)
+            # Wait for any concurrent update of the same week so winners are only recorded once
+            matchups = db.session.query(Matchup).filter_by(week=week).with_for_update().all()
+            balances = calculate_matchup_balances([matchup.id for matchup in matchups])
+            _, decided = calculate_matchup_results(matchups, balances)
         
         db.session.commit()
+        invalidate_matchup_standings(decided)
         
         return jsonify({
             'message': 'Results updated successfully',
@@ -82,49 +106,40 @@ def get_weekly_results(week):
     try:
         user_id = int(get_jwt_identity())
         
-        # Get all matchups for the week
-        matchups = Matchup.query.filter_by(week=week).all()
+        # Get all matchups for the week, with both users loaded for to_dict()
+        matchups = db.session.query(Matchup).filter_by(week=week).options(
+            selectinload(Matchup.user1),
+            selectinload(Matchup.user2)
+        ).all()
+        
+        # Only show matchups from leagues the user belongs to, checked in one query
+        league_ids = {matchup.league_id for matchup in matchups}
+        member_league_ids = {
+            league_id for league_id, in db.session.query(LeagueMember.league_id).filter(
+                LeagueMember.user_id == user_id,
+                LeagueMember.league_id.in_(league_ids)
+            )
+        } if league_ids else set()
+        matchups = [matchup for matchup in matchups if matchup.league_id in member_league_ids]
+        
+        # Get all bets for these matchups in one query
+        bets_by_matchup_user = get_bets_by_matchup_and_user([matchup.id for matchup in matchups])
+        
+        # The bets are loaded for the response anyway, so balance them here rather than in SQL
+        balances = {
+            key: calculate_final_balance(bets) for key, bets in bets_by_matchup_user.items()
+        }
+        
+        # Record winners and standings for any newly decided matchups
+        matchup_results, decided = calculate_matchup_results(matchups, balances)
         
         results = []
         
         for matchup in matchups:
-            # Check if user is part of this matchup or league
-            league_member = LeagueMember.query.filter_by(
-                league_id=matchup.league_id,
-                user_id=user_id
-            ).first()
-            
-            if not league_member:
-                continue  # Skip if user not in league
-            
-            # Get all bets for both users in this matchup
-            user1_bets = Bet.query.filter_by(
-                user_id=matchup.user1_id,
-                matchup_id=matchup.id
-            ).all()
-            
-            user2_bets = Bet.query.filter_by(
-                user_id=matchup.user2_id,
-                matchup_id=matchup.id
-            ).all()
-            
-            # Calculate final balances
-            user1_balance = calculate_final_balance(user1_bets)
-            user2_balance = calculate_final_balance(user2_bets)
-            
-            # Determine winner
-            winner_id = None
-            if user1_balance > user2_balance:
-                winner_id = matchup.user1_id
-            elif user2_balance > user1_balance:
-                winner_id = matchup.user2_id
-            
-            # Update matchup winner if not already set
-            if matchup.winner_id is None and winner_id:
-                matchup.winner_id = winner_id
-                
-                # Update league standings
-                update_league_standings(matchup.league_id, matchup.user1_id, matchup.user2_id, winner_id)
+            # Bets and final balances for both users in this matchup
+            user1_bets = bets_by_matchup_user[(matchup.id, matchup.user1_id)]
+            user2_bets = bets_by_matchup_user[(matchup.id, matchup.user2_id)]
+            _, user1_balance, user2_balance = matchup_results[matchup.id]
             
             matchup_data = matchup.to_dict()
             matchup_data['user1_balance'] = user1_balance
@@ -135,6 +150,7 @@ def get_weekly_results(week):
             results.append(matchup_data)
         
         db.session.commit()
+        invalidate_matchup_standings(decided)
         
         return jsonify({
             'week': week,
@@ -144,38 +160,84 @@ def get_weekly_results(week):
     except Exception as e:
         return jsonify({'error': 'Failed to get weekly results', 'details': str(e)}), 500
 
-def calculate_final_balance(bets):
-    """Calculate final balance after all bets are settled"""
-    balance = 100.0  # Starting balance
+def get_pending_bets_by_game(game_ids):
+    """
+    Fetch pending bets for many games in a single query.
     
-    for bet in bets:
-        if bet.status == 'won':
-            balance += bet.potential_payout - bet.amount  # Net winnings
-        elif bet.status == 'lost':
-            balance -= bet.amount  # Lost the bet amount
-        # Pending bets don't affect balance yet
+    Args:
+        game_ids: List of game IDs
     
-    return balance
-
-def calculate_matchup_results(week):
-    """Calculate results for all matchups in a given week"""
-    matchups = Matchup.query.filter_by(week=week).all()
+    Returns:
+        defaultdict mapping game_id to a list of (bet_id, outcome_name) tuples for its pending
+        moneyline bets; spreads and totals bets are left pending
+    """
+    bets_by_game = defaultdict(list)
     
-    for matchup in matchups:
-        # Get all bets for both users
-        user1_bets = Bet.query.filter_by(
-            user_id=matchup.user1_id,
-            matchup_id=matchup.id
-        ).all()
+    if game_ids:
+        # Bets reference games through their betting option. Only moneyline bets can be
+        # settled from the winner alone, as in enhanced_results.evaluate_bet
+        rows = db.session.query(Bet.id, BettingOption.game_id, BettingOption.outcome_name)\
+            .join(BettingOption, Bet.betting_option_id == BettingOption.id)\
+            .filter(
+                BettingOption.game_id.in_(game_ids),
+                BettingOption.market_type == 'h2h',
+                Bet.status == 'pending'
+            ).all()
         
-        user2_bets = Bet.query.filter_by(
-            user_id=matchup.user2_id,
-            matchup_id=matchup.id
+        for bet_id, game_id, outcome_name in rows:
+            bets_by_game[game_id].append((bet_id, outcome_name))
+    
+    return bets_by_game
+
+def get_bets_by_matchup_and_user(matchup_ids):
+    """
+    Fetch bets for many matchups in a single query.
+    
+    Args:
+        matchup_ids: List of matchup IDs
+    
+    Returns:
+        defaultdict mapping (matchup_id, user_id) to that user's list of bets
+    """
+    bets_by_matchup_user = defaultdict(list)
+    
+    if matchup_ids:
+        # Bet.to_dict() includes the betting option and its game, so load them up front
+        bets = Bet.query.filter(Bet.matchup_id.in_(matchup_ids)).options(
+            selectinload(Bet.betting_option).selectinload(BettingOption.game)
         ).all()
         
+        for bet in bets:
+            bets_by_matchup_user[(bet.matchup_id, bet.user_id)].append(bet)
+    
+    return bets_by_matchup_user
+
+def calculate_final_balance(bets):
+    """Calculate final balance after all bets are settled"""
+    # Won bets add their net winnings, lost bets subtract the amount; pending bets don't affect balance yet
+    return STARTING_BALANCE + sum(
+        bet.potential_payout - bet.amount if bet.status == 'won' else -bet.amount
+        for bet in bets
+        if bet.status == 'won' or bet.status == 'lost'
+    )
+
+def _compute_matchup_results(balances, matchups):
+    """
+    Compute balances and winners for matchups from precomputed user balances.
+    
+    Args:
+        balances: Mapping of (matchup_id, user_id) to final balance; missing users have the starting balance
+        matchups: List of Matchup objects
+    
+    Returns:
+        Dict mapping matchup ID to (winner_id, user1_balance, user2_balance); winner_id is None on a tie
+    """
+    matchup_results = {}
+    
+    for matchup in matchups:
         # Calculate final balances
-        user1_balance = calculate_final_balance(user1_bets)
-        user2_balance = calculate_final_balance(user2_bets)
+        user1_balance = balances.get((matchup.id, matchup.user1_id), STARTING_BALANCE)
+        user2_balance = balances.get((matchup.id, matchup.user2_id), STARTING_BALANCE)
         
         # Determine winner
         winner_id = None
@@ -184,40 +246,82 @@ def calculate_matchup_results(week):
         elif user2_balance > user1_balance:
             winner_id = matchup.user2_id
         
-        # Update matchup winner if not already set
-        if matchup.winner_id is None and winner_id:
-            matchup.winner_id = winner_id
-            
-            # Update league standings
-            update_league_standings(matchup.league_id, matchup.user1_id, matchup.user2_id, winner_id)
+        matchup_results[matchup.id] = (winner_id, user1_balance, user2_balance)
+    
+    return matchup_results
 
-def update_league_standings(league_id, user1_id, user2_id, winner_id):
-    """Update league standings after a matchup"""
-    # Get league members
-    member1 = LeagueMember.query.filter_by(league_id=league_id, user_id=user1_id).first()
-    member2 = LeagueMember.query.filter_by(league_id=league_id, user_id=user2_id).first()
+def calculate_matchup_results(matchups, balances):
+    """
+    Record winners and update standings for matchups that don't have a winner yet.
+    
+    Args:
+        matchups: List of Matchup objects
+        balances: Mapping of (matchup_id, user_id) to final balance for those matchups
     
+    Returns:
+        Tuple of a dict mapping matchup ID to (winner_id, user1_balance, user2_balance),
+        and the list of matchups that were given a winner
+    """
+    matchup_results = _compute_matchup_results(balances, matchups)
+    
+    # Matchups that get a winner now, and the league members whose standings change
+    decided = [
+        matchup for matchup in matchups
+        if matchup.winner_id is None and matchup_results[matchup.id][0]
+    ]
+    members = get_league_members_by_user([
+        (matchup.league_id, user_id) for matchup in decided for user_id in (matchup.user1_id, matchup.user2_id)
+    ])
+    
+    for matchup in decided:
+        winner_id, user1_balance, user2_balance = matchup_results[matchup.id]
+        
+        # Update matchup winner
+        matchup.winner_id = winner_id
+        
+        # Update league standings
+        update_league_standings(
+            members.get((matchup.league_id, matchup.user1_id)),
+            members.get((matchup.league_id, matchup.user2_id)),
+            user1_balance, user2_balance, winner_id
+        )
+    
+    return matchup_results, decided
+
+def get_league_members_by_user(league_user_pairs):
+    """
+    Fetch league members for many (league_id, user_id) pairs in a single query.
+    
+    Args:
+        league_user_pairs: List of (league_id, user_id) tuples
+    
+    Returns:
+        Dict mapping (league_id, user_id) to LeagueMember
+    """
+    if not league_user_pairs:
+        return {}
+    
+    league_ids = {league_id for league_id, _ in league_user_pairs}
+    user_ids = {user_id for _, user_id in league_user_pairs}
+    members = LeagueMember.query.filter(
+        LeagueMember.league_id.in_(league_ids),
+        LeagueMember.user_id.in_(user_ids)
+    ).all()
+    
+    return {(member.league_id, member.user_id): member for member in members}
+
+def update_league_standings(member1, member2, user1_balance, user2_balance, winner_id):
+    """Update league standings after a matchup using the matchup's final balances"""
     if member1 and member2:
         # Update wins/losses
-        if winner_id == user1_id:
+        if winner_id == member1.user_id:
             member1.wins += 1
             member2.losses += 1
-        elif winner_id == user2_id:
+        elif winner_id == member2.user_id:
             member2.wins += 1
             member1.losses += 1
         
         # Update points (using final balances)
-        matchup = Matchup.query.filter_by(league_id=league_id, user1_id=user1_id, user2_id=user2_id).first()
-        if matchup:
-            user1_bets = Bet.query.filter_by(user_id=user1_id, matchup_id=matchup.id).all()
-            user2_bets = Bet.query.filter_by(user_id=user2_id, matchup_id=matchup.id).all()
-        else:
-            user1_bets = []
-            user2_bets = []
-        
-        user1_balance = calculate_final_balance(user1_bets)
-        user2_balance = calculate_final_balance(user2_bets)
-        
         member1.points_for += user1_balance
         member1.points_against += user2_balance
         member2.points_for += user2_balance
@@ -0,0 +1,85 @@
+"""
+Response Cache Helpers
+
+This module defines the cache keys used for read-heavy league endpoints, the
+cached league membership check, and the helpers that invalidate them when the
+underlying data changes.
+"""
+
+from app import cache, db
+from app.models import LeagueMember
+
+# Short TTL so data that is not explicitly invalidated (e.g. member counts
+# shown to other members) is never stale for long
+DEFAULT_TIMEOUT = 30
+
+# Membership is only gained through join/create and positive results are the only
+# ones cached, so entries stay valid until they expire
+MEMBERSHIP_TIMEOUT = 3600
+
+
+def user_leagues_key(user_id: int) -> str:
+    """Cache key for the leagues list of a user"""
+    return f'ul:{user_id}'
+
+
+def league_standings_key(league_id: int) -> str:
+    """Cache key for the standings of a league"""
+    return f'stand:{league_id}'
+
+
+def membership_key(user_id: int, league_id: int) -> str:
+    """Cache key for whether a user belongs to a league"""
+    return f'm:{user_id}:{league_id}'
+
+
+def is_league_member(user_id: int, league_id: int) -> bool:
+    """Check league membership, answering from the cache when possible"""
+    key = membership_key(user_id, league_id)
+    is_member = cache.get(key)
+    
+    if is_member is None:
+        is_member = db.session.query(
+            LeagueMember.query.filter_by(league_id=league_id, user_id=user_id).exists()
+        ).scalar()
+        # Only cache members: with a per-process cache, a join invalidates just the
+        # worker that handled it, so a cached "not a member" could outlive the join
+        if is_member:
+            cache.set(key, True, timeout=MEMBERSHIP_TIMEOUT)
+    
+    return is_member
+
+
+def invalidate_membership(user_id: int, league_id: int) -> None:
+    """Drop the cached membership of a user in a league"""
+    cache.delete(membership_key(user_id, league_id))
+
+
+def invalidate_user_leagues(*user_ids: int) -> None:
+    """Drop cached leagues lists for the given users"""
+    cache.delete_many(*(user_leagues_key(user_id) for user_id in user_ids))
+
+
+def invalidate_league_members_leagues(league_id: int) -> None:
+    """Drop cached leagues lists for every member of a league"""
+    user_ids = [
+        user_id for user_id, in db.session.query(LeagueMember.user_id).filter_by(league_id=league_id)
+    ]
+    if user_ids:
+        invalidate_user_leagues(*user_ids)
+
+
+def invalidate_league_standings(*league_ids: int) -> None:
+    """Drop cached standings for the given leagues"""
+    cache.delete_many(*(league_standings_key(league_id) for league_id in league_ids))
+
+
+def invalidate_matchup_standings(matchups) -> None:
+    """Drop cached standings and leagues lists affected by newly decided matchups"""
+    if not matchups:
+        return
+    
+    invalidate_league_standings(*{matchup.league_id for matchup in matchups})
+    invalidate_user_leagues(*{
+        user_id for matchup in matchups for user_id in (matchup.user1_id, matchup.user2_id)
+    })
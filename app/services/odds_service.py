@@ -1,8 +1,66 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import logging
+import orjson
 import os
+import random
+from app import cache
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import List, Dict, Optional
 
+logger = logging.getLogger(__name__)
+
+# Odds and scores change on the minute scale, so API responses are reused for this many seconds
+ODDS_CACHE_TIMEOUT = 60
+
+# (connect, read) timeout in seconds for odds API requests
+REQUEST_TIMEOUT = (3, 10)
+
+# NFL season typically starts in September
+# This is a simplified calculation - you might want to use actual NFL schedule
+_SEASON_START = datetime(2024, 9, 5)  # Approximate start of 2024 season
+
+# Week 1 NFL 2024 schedule (simplified) as (away_team, home_team) pairs, used for mock odds
+_WEEK1_GAMES = (
+    ('Baltimore Ravens', 'Kansas City Chiefs'),
+    ('Buffalo Bills', 'Arizona Cardinals'),
+    ('Cincinnati Bengals', 'New England Patriots'),
+    ('Cleveland Browns', 'Dallas Cowboys'),
+    ('Denver Broncos', 'Seattle Seahawks'),
+    ('Houston Texans', 'Indianapolis Colts'),
+    ('Jacksonville Jaguars', 'Miami Dolphins'),
+    ('Las Vegas Raiders', 'Los Angeles Chargers'),
+    ('Los Angeles Rams', 'Detroit Lions'),
+    ('New York Giants', 'Minnesota Vikings'),
+    ('New York Jets', 'San Francisco 49ers'),
+    ('Pittsburgh Steelers', 'Atlanta Falcons'),
+    ('Tampa Bay Buccaneers', 'Washington Commanders'),
+    ('Tennessee Titans', 'Chicago Bears'),
+    ('Green Bay Packers', 'Philadelphia Eagles'),
+    ('Carolina Panthers', 'New Orleans Saints')
+)
+
+@lru_cache(maxsize=32)
+def _week_date_range(week: int) -> tuple:
+    """Calculate the (start, end) datetimes of an NFL week"""
+    week_start = _SEASON_START + timedelta(weeks=week-1)
+    week_end = week_start + timedelta(days=7)
+    
+    return week_start, week_end
+
+def _create_session() -> requests.Session:
+    """Create an HTTP session with pooled connections and retries for transient failures"""
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries))
+    return session
+
+# Shared by every OddsService instance so connections stay warm between requests
+_session = _create_session()
+
 class OddsService:
     """Service for integrating with external sports odds APIs"""
     
@@ -11,10 +69,19 @@ class OddsService:
         # For this example, I'll use The Odds API format
         self.api_key = os.getenv('ODDS_API_KEY', 'your-api-key-here')
         self.base_url = 'https://api.the-odds-api.com/v4'
+        self.session = _session
         
         # Fallback mock data for development/testing
         self.mock_data = self.api_key == 'your-api-key-here'  # Use mock data if no real API key
     
+    @staticmethod
+    def __caching_id__(obj):
+        """Memoize key for this service; every instance talks to the same API, so they share entries"""
+        # Flask-Caching calls this as getattr(obj, '__caching_id__', repr)(obj)
+        return f'{obj.__class__.__name__}:{obj.base_url}'
+    
+    # Not memoized: this saves betting options to the database, and force-update
+    # must always reach the API
     def get_nfl_odds(self, week: int) -> List[Dict]:
         """Get NFL odds for a specific week and save all betting options to database"""
         if self.mock_data:
@@ -30,14 +97,14 @@ class OddsService:
                 'markets': 'h2h,spreads,totals'
             }
             
-            print(f"🌐 Fetching NFL odds from: {url}")
-            print(f"🔑 Using API key: {self.api_key[:8]}...")
+            logger.debug("Fetching NFL odds from: %s", url)
+            logger.debug("Using API key: %s...", self.api_key[:8])
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             
-            odds_data = response.json()
-            print(f"✅ Successfully fetched {len(odds_data)} NFL games")
+            odds_data = orjson.loads(response.content)
+            logger.info("Successfully fetched %d NFL games", len(odds_data))
             
             # Save all betting options to database
             self._save_betting_options_to_db(odds_data, week)
@@ -57,9 +124,10 @@ class OddsService:
             return formatted_odds
             
         except requests.RequestException as e:
-            print(f"❌ Error fetching odds: {e}")
+            logger.warning("Error fetching odds: %s", e)
             return self._get_mock_nfl_odds(week)  # Fallback to mock data
     
+    @cache.memoize(timeout=ODDS_CACHE_TIMEOUT)
     def get_game_odds(self, game_id: str) -> Optional[Dict]:
         """Get odds for a specific game"""
         if self.mock_data:
@@ -74,23 +142,25 @@ class OddsService:
                 'eventIds': game_id
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             
-            games = response.json()
+            games = orjson.loads(response.content)
             if games:
                 game = games[0]
+                odds_by_team = self._build_h2h_map(game['bookmakers'])
                 return {
-                    'home_odds': self._extract_odds(game['bookmakers'], game['home_team']),
-                    'away_odds': self._extract_odds(game['bookmakers'], game['away_team'])
+                    'home_odds': odds_by_team.get(game['home_team'], 1.0),  # Default odds if not found
+                    'away_odds': odds_by_team.get(game['away_team'], 1.0)
                 }
             
             return None
             
         except requests.RequestException as e:
-            print(f"Error fetching game odds: {e}")
+            logger.warning("Error fetching game odds: %s", e)
             return self._get_mock_game_odds(game_id)
     
+    @cache.memoize(timeout=ODDS_CACHE_TIMEOUT)
     def get_game_result(self, game_id: str) -> Optional[str]:
         """Get the result of a completed game"""
         if self.mock_data:
@@ -103,38 +173,88 @@ class OddsService:
                 'eventIds': game_id
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             
-            games = response.json()
+            games = orjson.loads(response.content)
             if games:
-                game = games[0]
-                if game['completed']:
-                    home_score = game['scores'][0]['score']
-                    away_score = game['scores'][1]['score']
-                    
-                    if home_score > away_score:
-                        return 'home_win'
-                    elif away_score > home_score:
-                        return 'away_win'
-                    else:
-                        return 'tie'  # Handle ties if needed
+                return self._parse_game_result(games[0])
             
             return None
             
         except requests.RequestException as e:
-            print(f"Error fetching game result: {e}")
+            logger.warning("Error fetching game result: %s", e)
             return self._get_mock_game_result(game_id)
     
-    def _extract_odds(self, bookmakers: List[Dict], team: str) -> float:
-        """Extract odds for a specific team from bookmaker data"""
+    @cache.memoize(timeout=ODDS_CACHE_TIMEOUT)
+    def get_all_game_results(self, game_ids: List[str]) -> Dict[str, str]:
+        """Get results for many games with a single scores request
+        
+        Args:
+            game_ids: IDs of the games to look up
+        
+        Returns:
+            Dict mapping game ID to 'home_win', 'away_win' or 'tie' for completed games
+        """
+        if not game_ids:
+            return {}
+        
+        if self.mock_data:
+            return {game_id: self._get_mock_game_result(game_id) for game_id in game_ids}
+        
+        try:
+            url = f"{self.base_url}/sports/americanfootball_nfl/scores"
+            params = {
+                'apiKey': self.api_key,
+                'eventIds': ','.join(game_ids)
+            }
+            
+            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            
+            results = {}
+            for game in orjson.loads(response.content):
+                result = self._parse_game_result(game)
+                if result:
+                    results[game['id']] = result
+            
+            return results
+            
+        except requests.RequestException as e:
+            logger.warning("Error fetching game results: %s", e)
+            return {game_id: self._get_mock_game_result(game_id) for game_id in game_ids}
+    
+    def _parse_game_result(self, game: Dict) -> Optional[str]:
+        """Determine the result of a game from scores API data"""
+        if not game['completed']:
+            return None
+        
+        home_score = game['scores'][0]['score']
+        away_score = game['scores'][1]['score']
+        
+        if home_score > away_score:
+            return 'home_win'
+        elif away_score > home_score:
+            return 'away_win'
+        else:
+            return 'tie'  # Handle ties if needed
+    
+    def _build_h2h_map(self, bookmakers: List[Dict]) -> Dict[str, float]:
+        """Map each team to its moneyline odds in one pass over bookmaker data
+        
+        Args:
+            bookmakers: Bookmaker entries from the odds API
+        
+        Returns:
+            Dict mapping team name to the price from the first bookmaker listing it
+        """
+        odds_by_team = {}
         for bookmaker in bookmakers:
             for market in bookmaker['markets']:
                 if market['key'] == 'h2h':
                     for outcome in market['outcomes']:
-                        if outcome['name'] == team:
-                            return float(outcome['price'])
-        return 1.0  # Default odds if not found
+                        odds_by_team.setdefault(outcome['name'], float(outcome['price']))
+        return odds_by_team
     
     def _convert_american_to_decimal(self, american_odds: int) -> float:
         """Convert American odds to decimal odds"""
@@ -150,30 +270,24 @@ class OddsService:
         from app.models import Game, BettingOption
         from app import db
         
-        betting_options_saved = 0
+        game_ids = [game_data['id'] for game_data in odds_data]
+        if not game_ids:
+            return
+        
+        # Keyed by ID so a game listed twice is only upserted once
+        games = {}
+        betting_options = []
         
         for game_data in odds_data:
-            # Save or update game
-            existing_game = Game.query.get(game_data['id'])
-            if existing_game:
-                existing_game.home_team = game_data['home_team']
-                existing_game.away_team = game_data['away_team']
-                existing_game.start_time = datetime.fromisoformat(game_data['commence_time'])
-                existing_game.week = week
-            else:
-                game = Game(
-                    id=game_data['id'],
-                    home_team=game_data['home_team'],
-                    away_team=game_data['away_team'],
-                    start_time=datetime.fromisoformat(game_data['commence_time']),
-                    week=week
-                )
-                db.session.add(game)
-            
-            # Clear existing betting options for this game
-            BettingOption.query.filter_by(game_id=game_data['id']).delete()
+            games[game_data['id']] = {
+                'id': game_data['id'],
+                'home_team': game_data['home_team'],
+                'away_team': game_data['away_team'],
+                'start_time': datetime.fromisoformat(game_data['commence_time']),
+                'week': week
+            }
             
-            # Save all betting options from all bookmakers
+            # Collect all betting options from all bookmakers
             for bookmaker in game_data.get('bookmakers', []):
                 bookmaker_name = bookmaker['key']
                 
@@ -181,57 +295,46 @@ class OddsService:
                     market_type = market['key']  # h2h, spreads, totals
                     
                     for outcome in market.get('outcomes', []):
-                        betting_option = BettingOption(
-                            game_id=game_data['id'],
-                            market_type=market_type,
-                            outcome_name=outcome['name'],
-                            outcome_point=outcome.get('point'),
-                            bookmaker=bookmaker_name,
-                            american_odds=outcome['price'],
-                            decimal_odds=self._convert_american_to_decimal(outcome['price'])
-                        )
-                        db.session.add(betting_option)
-                        betting_options_saved += 1
+                        betting_options.append({
+                            'game_id': game_data['id'],
+                            'market_type': market_type,
+                            'outcome_name': outcome['name'],
+                            'outcome_point': outcome.get('point'),
+                            'bookmaker': bookmaker_name,
+                            'american_odds': outcome['price'],
+                            'decimal_odds': self._convert_american_to_decimal(outcome['price'])
+                        })
         
+        # Upsert all games in one statement, before the options that reference them
+        stmt = pg_insert(Game).values(list(games.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Game.id],
+            set_={
+                'home_team': stmt.excluded.home_team,
+                'away_team': stmt.excluded.away_team,
+                'start_time': stmt.excluded.start_time,
+                'week': stmt.excluded.week
+            }
+        )
+        db.session.execute(stmt)
+        
+        # Replace the betting options of every game with one DELETE and one bulk INSERT
+        BettingOption.query.filter(BettingOption.game_id.in_(game_ids)).delete(synchronize_session=False)
+        if betting_options:
+            db.session.bulk_insert_mappings(BettingOption, betting_options)
+        
+        betting_options_saved = len(betting_options)
         db.session.commit()
-        print(f"💾 Saved {betting_options_saved} betting options to database")
+        logger.info("Saved %d betting options to database", betting_options_saved)
     
     def _get_week_date_range(self, week: int) -> tuple:
         """Calculate date range for NFL week"""
-        # NFL season typically starts in September
-        # This is a simplified calculation - you might want to use actual NFL schedule
-        season_start = datetime(2024, 9, 5)  # Approximate start of 2024 season
-        week_start = season_start + timedelta(weeks=week-1)
-        week_end = week_start + timedelta(days=7)
-        
-        return week_start, week_end
+        return _week_date_range(week)
     
     def _get_mock_nfl_odds(self, week: int) -> List[Dict]:
         """Mock NFL odds data for development/testing - Week 1 2024"""
-        import random
-        
-        # Week 1 NFL 2024 schedule (simplified)
-        week1_games = [
-            ('Baltimore Ravens', 'Kansas City Chiefs'),
-            ('Buffalo Bills', 'Arizona Cardinals'),
-            ('Cincinnati Bengals', 'New England Patriots'),
-            ('Cleveland Browns', 'Dallas Cowboys'),
-            ('Denver Broncos', 'Seattle Seahawks'),
-            ('Houston Texans', 'Indianapolis Colts'),
-            ('Jacksonville Jaguars', 'Miami Dolphins'),
-            ('Las Vegas Raiders', 'Los Angeles Chargers'),
-            ('Los Angeles Rams', 'Detroit Lions'),
-            ('New York Giants', 'Minnesota Vikings'),
-            ('New York Jets', 'San Francisco 49ers'),
-            ('Pittsburgh Steelers', 'Atlanta Falcons'),
-            ('Tampa Bay Buccaneers', 'Washington Commanders'),
-            ('Tennessee Titans', 'Chicago Bears'),
-            ('Green Bay Packers', 'Philadelphia Eagles'),
-            ('Carolina Panthers', 'New Orleans Saints')
-        ]
-        
         mock_games = []
-        for i, (away_team, home_team) in enumerate(week1_games):
+        for i, (away_team, home_team) in enumerate(_WEEK1_GAMES):
             # Generate realistic odds (1.5 to 3.0 range)
             home_odds = round(random.uniform(1.5, 3.0), 2)
             away_odds = round(random.uniform(1.5, 3.0), 2)
@@ -267,5 +370,4 @@ class OddsService:
     
     def _get_mock_game_result(self, game_id: str) -> str:
         """Mock game result - randomly determine winner"""
-        import random
         return random.choice(['home_win', 'away_win'])
@@ -5,10 +5,12 @@ This module provides functions to calculate parlay odds, payouts, and profits
 based on American odds from multiple betting options.
 """
 
-from functools import reduce
+from functools import lru_cache
+from math import prod
 from typing import List, Dict, Union
 
 
+@lru_cache(maxsize=2048)
 def american_to_decimal(american_odds: int) -> float:
     """
     Convert American odds to decimal odds.
@@ -19,10 +21,24 @@ def american_to_decimal(american_odds: int) -> float:
     Returns:
         Decimal odds (e.g., 1.67, 3.0)
     """
-    if american_odds > 0:
-        return (american_odds / 100) + 1
-    else:
-        return (100 / abs(american_odds)) + 1
+    return 1 + (american_odds / 100 if american_odds > 0 else -100 / american_odds)
+
+
+def _parlay_2_legs(a: int, b: int) -> float:
+    """Combined decimal odds for a two-leg parlay, unrolled."""
+    return american_to_decimal(a) * american_to_decimal(b)
+
+
+def _parlay_3_legs(a: int, b: int, c: int) -> float:
+    """Combined decimal odds for a three-leg parlay, unrolled."""
+    return american_to_decimal(a) * american_to_decimal(b) * american_to_decimal(c)
+
+
+# Unrolled pricing for the most common leg counts, keyed by number of legs
+_SPECIALIZED_PARLAYS = {
+    2: _parlay_2_legs,
+    3: _parlay_3_legs,
+}
 
 
 def parlay_decimal_odds(american_odds_list: List[int]) -> float:
@@ -38,8 +54,11 @@ def parlay_decimal_odds(american_odds_list: List[int]) -> float:
     if len(american_odds_list) < 2:
         raise ValueError("Parlay must have at least 2 legs")
     
-    decimal_odds = [american_to_decimal(odds) for odds in american_odds_list]
-    return reduce(lambda x, y: x * y, decimal_odds)
+    specialized = _SPECIALIZED_PARLAYS.get(len(american_odds_list))
+    if specialized is not None:
+        return specialized(*american_odds_list)
+    
+    return prod(american_to_decimal(odds) for odds in american_odds_list)
 
 
 def parlay_payout(stake: float, american_odds_list: List[int]) -> float:
@@ -51,10 +70,9 @@ def parlay_payout(stake: float, american_odds_list: List[int]) -> float:
         american_odds_list: List of American odds for each leg
         
     Returns:
-        Total payout amount
+        Total payout amount, unrounded
     """
-    odds = parlay_decimal_odds(american_odds_list)
-    return round(stake * odds, 2)
+    return stake * parlay_decimal_odds(american_odds_list)
 
 
 def parlay_profit(stake: float, american_odds_list: List[int]) -> Dict[str, float]:
@@ -66,19 +84,37 @@ def parlay_profit(stake: float, american_odds_list: List[int]) -> Dict[str, floa
         american_odds_list: List of American odds for each leg
         
     Returns:
-        Dictionary with 'return', 'profit', 'decimal_odds', and 'stake'
+        Dictionary with unrounded 'return', 'profit', 'decimal_odds', and 'stake'
     """
     decimal_odds = parlay_decimal_odds(american_odds_list)
-    total_return = parlay_payout(stake, american_odds_list)
+    total_return = stake * decimal_odds
     
     return {
         "stake": stake,
-        "decimal_odds": round(decimal_odds, 4),
+        "decimal_odds": decimal_odds,
         "return": total_return,
-        "profit": round(total_return - stake, 2)
+        "profit": total_return - stake
     }
 
 
+def format_parlay_result(parlay_info: Dict[str, float]) -> Dict[str, str]:
+    """
+    Format unrounded parlay numbers for display.
+    
+    Args:
+        parlay_info: Dictionary from parlay_profit or calculate_parlay_from_options
+        
+    Returns:
+        Copy of the dictionary with money fields as 2-decimal strings and
+        decimal_odds as a 4-decimal string
+    """
+    formatted = dict(parlay_info)
+    for key in ("stake", "return", "profit"):
+        formatted[key] = f"{parlay_info[key]:.2f}"
+    formatted["decimal_odds"] = f"{parlay_info['decimal_odds']:.4f}"
+    return formatted
+
+
 def validate_parlay_bets(betting_options: List[Dict]) -> bool:
     """
     Validate that betting options can be combined into a parlay.
@@ -96,9 +132,8 @@ def validate_parlay_bets(betting_options: List[Dict]) -> bool:
         raise ValueError("Parlay cannot have more than 10 legs")
     
     # Check that no options are locked
-    for option in betting_options:
-        if option.get('is_locked', False):
-            raise ValueError("Cannot include locked betting options in parlay")
+    if any(option.get('is_locked', False) for option in betting_options):
+        raise ValueError("Cannot include locked betting options in parlay")
     
     return True
 
@@ -116,13 +151,12 @@ def calculate_parlay_from_options(stake: float, betting_options: List[Dict]) ->
     """
     validate_parlay_bets(betting_options)
     
-    american_odds_list = [option['american_odds'] for option in betting_options]
-    parlay_info = parlay_profit(stake, american_odds_list)
-    
-    # Add leg details
+    # Collect odds and leg details in one pass
+    american_odds_list = []
     legs = []
     for i, option in enumerate(betting_options):
-        leg_info = {
+        american_odds_list.append(option['american_odds'])
+        legs.append({
             "leg_number": i + 1,
             "betting_option_id": option['id'],
             "game_id": option['game_id'],
@@ -132,8 +166,9 @@ def calculate_parlay_from_options(stake: float, betting_options: List[Dict]) ->
             "bookmaker": option['bookmaker'],
             "american_odds": option['american_odds'],
             "decimal_odds": option['decimal_odds']
-        }
-        legs.append(leg_info)
+        })
+    
+    parlay_info = parlay_profit(stake, american_odds_list)
     
     return {
         **parlay_info,
@@ -148,7 +183,7 @@ if __name__ == "__main__":
     test_odds = [-110, +150, -200]
     test_stake = 100
     
-    result = parlay_profit(test_stake, test_odds)
+    result = format_parlay_result(parlay_profit(test_stake, test_odds))
     print(f"Parlay calculation for odds {test_odds} with stake ${test_stake}:")
     print(f"Decimal odds: {result['decimal_odds']}")
     print(f"Total return: ${result['return']}")
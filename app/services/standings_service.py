@@ -0,0 +1,87 @@
+"""
+League Standings Helpers
+
+This module holds the matchup balance constant and the balance and standings
+helpers shared by the league and results blueprints.
+"""
+
+from app import db
+from app.models import Bet, Matchup
+from sqlalchemy import func, case
+
+# Weekly balance each member starts a matchup with
+STARTING_BALANCE = 100.0
+
+
+def get_longest_win_streaks(user_id, league_ids):
+    """
+    Get a user's longest matchup win streak in each of the given leagues.
+    
+    Args:
+        user_id: ID of the user
+        league_ids: Collection of league IDs
+    
+    Returns:
+        Dictionary mapping league ID to longest win streak
+    """
+    if not league_ids:
+        return {}
+    
+    # Decided matchups for the user across all leagues, in week order
+    rows = db.session.query(Matchup.league_id, Matchup.winner_id).filter(
+        Matchup.league_id.in_(league_ids),
+        Matchup.winner_id.isnot(None),
+        (Matchup.user1_id == user_id) | (Matchup.user2_id == user_id)
+    ).order_by(Matchup.league_id, Matchup.week).all()
+    
+    longest = {}
+    current = {}
+    for league_id, winner_id in rows:
+        if winner_id == user_id:
+            current[league_id] = current.get(league_id, 0) + 1
+            longest[league_id] = max(longest.get(league_id, 0), current[league_id])
+        else:
+            current[league_id] = 0
+    
+    return longest
+
+
+def bet_net_change():
+    """
+    Build a SQL expression summing the balance change of resolved bets.
+    
+    Won bets add their profit, lost bets subtract their stake, and all other
+    statuses leave the balance unchanged.
+    
+    Returns:
+        SQLAlchemy SUM(CASE ...) expression
+    """
+    return func.sum(case(
+        (Bet.status == 'won', Bet.potential_payout - Bet.amount),
+        (Bet.status == 'lost', -Bet.amount),
+        else_=0.0
+    ))
+
+
+def calculate_matchup_balances(matchup_ids):
+    """
+    Calculate final balances for every user in the given matchups in SQL.
+    
+    Args:
+        matchup_ids: Collection of matchup IDs
+    
+    Returns:
+        Dictionary mapping (matchup_id, user_id) to final balance (float).
+        Users without bets in a matchup are not included.
+    """
+    if not matchup_ids:
+        return {}
+    
+    rows = db.session.query(Bet.matchup_id, Bet.user_id, bet_net_change())\
+        .filter(Bet.matchup_id.in_(matchup_ids))\
+        .group_by(Bet.matchup_id, Bet.user_id).all()
+    
+    return {
+        (matchup_id, user_id): STARTING_BALANCE + (change or 0.0)
+        for matchup_id, user_id, change in rows
+    }
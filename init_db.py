@@ -10,7 +10,7 @@ from app import create_app, db
 
 def init_db():
     """Initialize the database with all tables."""
-    app = create_app()
+    app = create_app(minimal=True)
     
     with app.app_context():
         try:
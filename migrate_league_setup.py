@@ -11,24 +11,17 @@ from app.models import League
 
 def migrate_league_setup():
     """Add setup fields to existing leagues."""
-    app = create_app()
+    app = create_app(minimal=True)
     
     with app.app_context():
         try:
-            # Get all existing leagues
-            leagues = League.query.all()
+            # Backfill the setup flag in one UPDATE; setup_completed_at
+            # already defaults to NULL so it needs no backfill
+            updated = League.query.filter(League.is_setup_complete.is_(None)).update(
+                {League.is_setup_complete: False}, synchronize_session=False
+            )
             
-            print(f"Found {len(leagues)} leagues to migrate...")
-            
-            for league in leagues:
-                # Set default values for new fields if they don't exist
-                if not hasattr(league, 'is_setup_complete'):
-                    league.is_setup_complete = False
-                    print(f"Set is_setup_complete=False for league '{league.name}'")
-                
-                if not hasattr(league, 'setup_completed_at'):
-                    league.setup_completed_at = None
-                    print(f"Set setup_completed_at=None for league '{league.name}'")
+            print(f"Set is_setup_complete=False for {updated} leagues")
             
             # Commit changes
             db.session.commit()
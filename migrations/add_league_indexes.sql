@@ -0,0 +1,9 @@
+-- Migration: Add indexes for league standings and schedule lookups
+-- The unique constraints on league_members(league_id, user_id) and leagues(invite_code)
+-- already provide indexes for membership checks and invite code lookups.
+
+-- Standings: members of a league ordered by wins, then points for
+CREATE INDEX IF NOT EXISTS ix_lm_league_wins_pf ON league_members(league_id, wins DESC, points_for DESC);
+
+-- Schedules: matchups of a league ordered by week
+CREATE INDEX IF NOT EXISTS ix_matchup_league_week ON matchups(league_id, week DESC);
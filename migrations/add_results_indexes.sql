@@ -0,0 +1,14 @@
+-- Migration: Add indexes for results processing
+-- The unique constraint on league_members(league_id, user_id) already indexes membership checks.
+
+-- Bets for a set of matchups, optionally narrowed to one user
+CREATE INDEX IF NOT EXISTS ix_bet_matchup_user ON bets(matchup_id, user_id);
+
+-- Pending bets for the betting options of finished games
+CREATE INDEX IF NOT EXISTS ix_bet_option_pending ON bets(betting_option_id) WHERE status = 'pending';
+
+-- Betting options of a game
+CREATE INDEX IF NOT EXISTS ix_betting_option_game ON betting_options(game_id);
+
+-- Matchups of a week
+CREATE INDEX IF NOT EXISTS ix_matchup_week ON matchups(week);
@@ -22,23 +22,19 @@ def generate_round_robin_schedule(teams, weeks_required=14):
         teams = teams + ['BYE']
     
     n = len(teams)
+    m = n - 1
     rounds = []
-    fixed = teams[0]
-    rotating = teams[1:]
     
-    # Generate rounds - continue until we have enough weeks
-    round_num = 0
-    while len(rounds) < weeks_required:
-        if round_num >= n - 1:
-            # Reset rotation for additional rounds
-            round_num = 0
-            
+    # Circle method: team 0 stays fixed while the others rotate one slot per
+    # round, so each round's pairing is computed by indexing into `teams`
+    for round_num in range(weeks_required):
+        r = round_num % m
         round_matches = []
         
         # Create matchups for this round
         for i in range(n // 2):
-            home_team = teams[i]
-            away_team = teams[n - 1 - i]
+            home_team = teams[0 if i == 0 else (i - 1 - r) % m + 1]
+            away_team = teams[(n - 2 - i - r) % m + 1]
             
             # Skip if either team is BYE
             if home_team != 'BYE' and away_team != 'BYE':
@@ -48,19 +44,12 @@ def generate_round_robin_schedule(teams, weeks_required=14):
                 })
         
         rounds.append(round_matches)
-        
-        # Rotate teams (except the first one)
-        if len(rotating) > 1:
-            rotating = [rotating[-1]] + rotating[:-1]
-            teams = [fixed] + rotating
-        
-        round_num += 1
     
     return rounds[:weeks_required]
 
 def reset_and_regenerate_schedule(league_id):
     """Reset matchups and regenerate schedule for a league."""
-    app = create_app()
+    app = create_app(minimal=True)
     
     with app.app_context():
         # Get the league
@@ -77,60 +66,54 @@ def reset_and_regenerate_schedule(league_id):
             print("Need at least 2 members to generate schedule")
             return
         
+        # Extract user IDs and load every member's username in one query
+        team_ids = [member.user_id for member in members]
+        users = {u.id: u.username for u in User.query.filter(User.id.in_(team_ids)).all()}
+        
         print(f"Found {len(members)} members:")
         for member in members:
-            user = User.query.get(member.user_id)
-            print(f"  - {user.username}")
+            print(f"  - {users[member.user_id]}")
         
-        # Clear existing matchups and related bets
-        existing_matchups = Matchup.query.filter_by(league_id=league_id).all()
-        print(f"Clearing {len(existing_matchups)} existing matchups...")
-        
-        # First, delete bets that reference these matchups
-        matchup_ids = [m.id for m in existing_matchups]
-        if matchup_ids:
-            bets_to_delete = Bet.query.filter(Bet.matchup_id.in_(matchup_ids)).all()
-            print(f"Deleting {len(bets_to_delete)} bets associated with existing matchups...")
-            for bet in bets_to_delete:
-                db.session.delete(bet)
+        # Clear existing matchups and related bets, one DELETE each
+        # First, delete bets that reference this league's matchups
+        league_matchup_ids = db.session.query(Matchup.id).filter_by(league_id=league_id)
+        deleted_bets = db.session.query(Bet).filter(
+            Bet.matchup_id.in_(league_matchup_ids.scalar_subquery())
+        ).delete(synchronize_session=False)
+        print(f"Deleted {deleted_bets} bets associated with existing matchups...")
         
         # Also delete any bets with null matchup_id (orphaned bets)
-        null_bets = Bet.query.filter_by(matchup_id=None).all()
+        null_bets = db.session.query(Bet).filter(Bet.matchup_id.is_(None)).delete(synchronize_session=False)
         if null_bets:
-            print(f"Deleting {len(null_bets)} bets with null matchup_id...")
-            for bet in null_bets:
-                db.session.delete(bet)
+            print(f"Deleted {null_bets} bets with null matchup_id...")
         
         # Now delete the matchups
-        for matchup in existing_matchups:
-            db.session.delete(matchup)
-        
-        # Extract user IDs
-        team_ids = [member.user_id for member in members]
+        deleted_matchups = db.session.query(Matchup).filter_by(league_id=league_id).delete(synchronize_session=False)
+        print(f"Cleared {deleted_matchups} existing matchups...")
         
         # Generate new schedule
         schedule = generate_round_robin_schedule(team_ids, 14)
         
         print(f"Generated {len(schedule)} weeks of matchups:")
         
-        # Create new matchups
-        matchup_count = 0
+        # Create new matchups in one batched INSERT
+        new_matchups = [
+            Matchup(
+                league_id=league_id,
+                week=week_num,
+                user1_id=match['home'],
+                user2_id=match['away']
+            )
+            for week_num, week_matches in enumerate(schedule, 1)
+            for match in week_matches
+        ]
+        db.session.bulk_save_objects(new_matchups)
+        matchup_count = len(new_matchups)
+        
         for week_num, week_matches in enumerate(schedule, 1):
             print(f"  Week {week_num}: {len(week_matches)} matchups")
             for match in week_matches:
-                matchup = Matchup(
-                    league_id=league_id,
-                    week=week_num,
-                    user1_id=match['home'],
-                    user2_id=match['away']
-                )
-                db.session.add(matchup)
-                matchup_count += 1
-                
-                # Get usernames for display
-                user1 = User.query.get(match['home'])
-                user2 = User.query.get(match['away'])
-                print(f"    {user1.username} vs {user2.username}")
+                print(f"    {users[match['home']]} vs {users[match['away']]}")
         
         # Commit changes
         db.session.commit()
@@ -0,0 +1,34 @@
+from flask import Flask
+import pytest
+
+from app import cache
+from app.services.odds_service import OddsService
+
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    with app.app_context():
+        yield
+        cache.clear()
+
+
+def test_memoized_game_result_is_served_from_cache(app_context, monkeypatch):
+    calls = []
+    
+    def fake_result(self, game_id):
+        calls.append(game_id)
+        return 'home_win'
+    
+    monkeypatch.setattr(OddsService, '_get_mock_game_result', fake_result)
+    
+    first = OddsService()
+    first.mock_data = True
+    second = OddsService()
+    second.mock_data = True
+    
+    assert first.get_game_result('game-1') == 'home_win'
+    # A second call, even from another instance, is a cache hit
+    assert second.get_game_result('game-1') == 'home_win'
+    assert calls == ['game-1']